@@ -2,18 +2,35 @@ import json
 import os
 from functools import wraps
 from dotenv import load_dotenv
-from flask import Flask, redirect, url_for, render_template, session, request, jsonify
+from flask import Flask, Response, redirect, url_for, render_template, session, request, jsonify, stream_with_context
 from flask_dance.contrib.google import make_google_blueprint, google
 from flask_login import (
     LoginManager, login_user, logout_user, current_user, login_required, UserMixin
 )
 from flask_cors import CORS
-from pymongo import MongoClient
 from bson.objectid import ObjectId
+from markupsafe import Markup
 from collections import defaultdict
-import python_scripts.the_odds as the_odds
 from datetime import datetime, timezone
 from urllib.parse import urlencode
+from db import get_db, pool_stats
+from indexes import ensure_indexes
+import metrics
+import profiling
+import compression
+import invalidation
+from invalidation import TopicCache, notify
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from rosters import roster_hash, apply_delta, clean_player
+from lineup import clean_slots
+from updates import sse_stream, data_version
+from fragments import fragment_cache
+from tables import (
+    POSITIONS_BY_PROP, POSITIONS_ORDER, SCORING_LABELS,
+    build_logo_map, build_row, get_recent_game, refresh_team_table, load_team_tables, prop_title,
+)
+from games import games_page, game_summary, archived_week, archived_week_list
 
 # Load env
 load_dotenv()
@@ -21,34 +38,43 @@ load_dotenv()
 # Flask app setup
 app = Flask(__name__)
 CORS(app)
+metrics.init_app(app)
+compression.init_app(app)
+invalidation.init_app(app)
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", "dev")
 
-# MongoDB setup
-client = MongoClient("mongodb://localhost:27017/")
-db = client["user_data"]
-users_collection = db["users"]
+# MongoDB setup (clients are created lazily per worker, see db.py)
+def fantasy_db():
+    return get_db("fantasy_football")
+
+def users_collection():
+    return get_db("user_data")["users"]
+
+# Per-worker caches, emptied by the invalidation bus when the data under them changes
+logo_cache   = TopicCache("logos", ["teams"])
+user_cache   = TopicCache("users", ["users"], keyed=True)
+search_cache = TopicCache("search_index", ["players"])
+
+def logo_map():
+    return logo_cache.get("all", lambda: build_logo_map(fantasy_db()["teams"]))
 
 # Flask-Login setup
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = "index"
 
-POSITIONS_BY_PROP = {
-    "player_pass_yds":      ["QB"],
-    "player_pass_tds":      ["QB"],
-    "player_rush_yds":      ["QB", "RB"],
-    "player_rush_tds":      ["QB", "RB"],
-    "player_receptions":    ["RB", "WR", "TE"],
-    "player_reception_yds": ["RB", "WR", "TE"],
-    "player_reception_tds": ["RB", "WR", "TE"],
-}
-POSITIONS_ORDER = ["QB", "RB", "WR", "TE"]
-
-SCORING_LABELS = {
-    "espn_ppr":  "Fantasy (PPR)",
-    "espn_half": "Fantasy (Half)",
-    "espn_std":  "Fantasy (Standard)",
-}
+# Admin-only request profiling (registered after metrics so the Mongo scope exists)
+profiling.init_app(app)
+
+# Index bootstrap (also available as `python indexes.py`)
+if os.environ.get("ENSURE_INDEXES") == "1":
+    ensure_indexes()
+
+# Attempts at the teamsRev compare-and-set in /api/teams/bulk
+BULK_SAVE_RETRIES = 3
+
+# Rows per page on /nfl/players/<id>
+PLAYER_GAMES_PER_PAGE = 20
 
 def iso_to_dt(s):
     try:
@@ -56,117 +82,59 @@ def iso_to_dt(s):
     except Exception:
         return None
     
-def _parse_iso(s: str):
-    try:
-        # handles ...Z by converting to +00:00
-        return datetime.fromisoformat(s.replace("Z", "+00:00"))
-    except Exception:
-        return None
-
-def build_logo_map(tcol):
-    out = {}
-    for t in tcol.find({}, {"_id": 0, "abbrev": 1, "logo": 1}):
-        ab = (t.get("abbrev") or "").upper()
-        if ab and ab not in out:
-            out[ab] = t.get("logo")
-    return out
-
-def get_recent_game(player_doc):
-    games = player_doc.get("games") or []
-    games = [g for g in games if g.get("commence_time")]
-    games.sort(key=lambda g: _parse_iso(g["commence_time"]) or datetime.min)
-    return games[-1] if games else None
-
-def team_and_opponent_cells(team_abbrev, recent, logo_by_abbrev):
-    team_abbrev = (team_abbrev or "—").upper()
-    team_logo = logo_by_abbrev.get(team_abbrev)
-    opp_abbrev = opp_logo = None
-    if recent:
-        home = (recent.get("home_team") or "").upper()
-        away = (recent.get("away_team") or "").upper()
-        if team_abbrev == home:
-            opp_abbrev = away
-        elif team_abbrev == away:
-            opp_abbrev = home
-        if opp_abbrev:
-            opp_logo = logo_by_abbrev.get(opp_abbrev)
-    return {"abbrev": team_abbrev, "logo": team_logo}, {"abbrev": opp_abbrev, "logo": opp_logo}
-
-def fantasy_cell(recent):
-    f = (recent or {}).get("fantasy") or {}
-    return {
-        "type": "fantasy",
-        "values": {
-            "espn_ppr":  round(float(f.get("espn_ppr", 0)  or 0), 2),
-            "espn_half": round(float(f.get("espn_half", 0) or 0), 2),
-            "espn_std":  round(float(f.get("espn_std", 0)  or 0), 2),
-        }
-    }
-
-def projection_values(recent, props):
-    proj = (recent or {}).get("projections") or {}
-    return [round(float(proj.get(prop, 0) or 0), 2) for prop in props]
-
 def build_columns(props, scoring_key):
     return (["Team", "Opponent", SCORING_LABELS.get(scorिंग_key := scoring_key, "Fantasy")] + [prop.replace("player_", "").replace("_", " ").title() for prop in props])
 
-def build_row(player_doc, logo_by_abbrev, props):
-    recent = get_recent_game(player_doc)
-    team_cell, opp_cell = team_and_opponent_cells(player_doc.get("team"), recent, logo_by_abbrev)
-    return {
-        "name":    player_doc.get("name"),
-        "espn_id": player_doc.get("espn_id"),
-        "stats":   [team_cell, opp_cell, fantasy_cell(recent)] + projection_values(recent, props),
-    }
-    
 @app.route("/")
 @app.route("/nfl")
 def nfl():
-    db   = client["fantasy_football"]
-    pcol = db["players"]
-    tcol = db["teams"]
-
-    logo_by_abbrev = build_logo_map(tcol)
-
-    players = list(pcol.find(
-        {"position": {"$in": POSITIONS_ORDER}},
-        {"name": 1, "espn_id": 1, "team": 1, "position": 1, "games": 1}
-    ))
-
-    grouped = defaultdict(list)
-    for p in players:
-        grouped[p["position"]].append(p)
-
-    scoring = request.args.get("scoring", "espn_ppr")
-    fantasy_header = SCORING_LABELS.get(scoring, "Fantasy")
+    # Rendered tables are cached per (role, data version); only the positions
+    # that miss are queried and rendered. They don't depend on ?scoring=: each
+    # fantasy cell carries all three values and table.js switches between them.
+    version = data_version()
+    keys = {role: ("nfl", role, version) for role in POSITIONS_ORDER}
+    tables = {role: fragment_cache.get(key) for role, key in keys.items()}
+    missing = [role for role, html in tables.items() if html is None]
+
+    if missing:
+        pcol = fantasy_db()["players"]
+
+        logo_by_abbrev = logo_map()
+
+        players = list(pcol.find(
+            {"position": {"$in": missing}},
+            {"name": 1, "espn_id": 1, "team": 1, "position": 1, "latest_game": 1}
+        ))
 
-    players_by_role = {}
-    for role in POSITIONS_ORDER:
-        group = grouped.get(role, [])
-        if not group:
-            continue
+        grouped = defaultdict(list)
+        for p in players:
+            grouped[p["position"]].append(p)
 
-        props = [prop for prop, roles in POSITIONS_BY_PROP.items() if role in roles]
-        columns = ["Team", "Opponent", fantasy_header] + [
-            prop.replace("player_", "").replace("_", " ").title() for prop in props
-        ]
+        for role in missing:
+            group = grouped.get(role, [])
+            if not group:
+                tables[role] = ""  # cached too, so an empty position doesn't re-query
+            else:
+                props = [prop for prop, roles in POSITIONS_BY_PROP.items() if role in roles]
+                columns = ["Team", "Opponent", SCORING_LABELS["espn_ppr"]] + [
+                    prop.replace("player_", "").replace("_", " ").title() for prop in props
+                ]
 
-        rows = [build_row(p, logo_by_abbrev, props) for p in group]
-        players_by_role[role] = {"columns": columns, "rows": rows}
+                rows = [build_row(p, logo_by_abbrev, props) for p in group]
+                data = {"columns": columns, "rows": rows, "props": props}
+                tables[role] = render_template("nfl_table.html", data=data)
+            fragment_cache.put(keys[role], tables[role])
 
-    return render_template("nfl.html", players=players_by_role)
+    tables = {role: Markup(html) for role, html in tables.items() if html}
+    return render_template("nfl.html", tables=tables)
 
 @app.route("/teams")
 @login_required
 def teams():
-    user = users_collection.find_one({"email": current_user.email}) or {}
+    user = users_collection().find_one({"email": current_user.email}) or {}
     teams = user.get("teams", [])
 
-    fdb  = client["fantasy_football"]
-    pcol = fdb["players"]
-    tcol = fdb["teams"]
-
-    logo_by_abbrev = build_logo_map(tcol)
+    tables_by_key = load_team_tables(current_user.email, teams)
 
     def make_roster_url(t):
         params = {"leagueId": t.get("leagueId"), "teamId": t.get("teamId")}
@@ -190,44 +158,14 @@ def teams():
         t["league_name"] = (t.get("league", {}) or {}).get("name") or t.get("leagueName") or "League"
         t["team_logo"] = t.get("teamLogo")  # provided by your content script, if you store it
 
-        # 1) IDs from saved roster (from your extension)
-        espn_ids = [str(p.get("espnId") or p.get("espn_id")) for p in t["players"] if p.get("espnId") or p.get("espn_id")]
-        espn_ids = list({int(eid) for eid in espn_ids if eid})
-
-        # 2) Fetch full docs exactly like /nfl uses
-        docs = list(pcol.find(
-            {"espn_id": {"$in": espn_ids}},
-            {"name": 1, "espn_id": 1, "team": 1, "position": 1, "games": 1}
-        ))
-
-        # 3) Any players missing in DB → placeholder with no games
-        docs_by_id = {str(d["espn_id"]): d for d in docs}
-        for p in t["players"]:
-            eid = str(p.get("espnId") or "")
-            if eid and eid not in docs_by_id:
-                docs_by_id[eid] = {
-                    "name": p.get("name"),
-                    "espn_id": eid,
-                    "team": p.get("team"),
-                    "position": None,
-                    "games": [],
-                }
-        resolved_players = list(docs_by_id.values())
-
-        # 4) Union of props across positions on this roster
-        roles_present = {rp.get("position") for rp in resolved_players if rp.get("position")}
-        props_union = [prop for prop, roles in POSITIONS_BY_PROP.items() if any(role in roles for role in roles_present)]
-
-        # 5) Build same columns/rows as /nfl, with Position column
-        columns = ["Team", "Opponent", "Pos", fantasy_header] + [
-            prop.replace("player_", "").replace("_", " ").title() for prop in props_union
-        ]
-        rows = [
-            {**row, "stats": [row["stats"][0], row["stats"][1], str(pdoc.get("position") or "").upper(), *row["stats"][2:]]}
-            for pdoc in resolved_players
-            for row in [build_row(pdoc, logo_by_abbrev, props_union)]
-        ]
-        t["table"] = {"columns": columns, "rows": rows}
+        # Precomputed on roster save / ingest (see tables.py, lineup.py)
+        stored = tables_by_key.get((t.get("leagueId"), t.get("teamId"))) or {}
+        table = stored.get("table") or {"columns": [], "rows": [], "props": []}
+        t["lineup"] = stored.get("lineup") or {}
+        t["table"] = {
+            **table,
+            "columns": [fantasy_header if c == "Fantasy" else c for c in table["columns"]],
+        }
 
     return render_template("teams.html", teams=teams)
 
@@ -241,8 +179,10 @@ class User(UserMixin):
 # Flask-Login user loader
 @login_manager.user_loader
 def load_user(user_id):
-    user_doc = users_collection.find_one({"_id": ObjectId(user_id)})
-    return User(user_doc) if user_doc else None
+    def load():
+        user_doc = users_collection().find_one({"_id": ObjectId(user_id)})
+        return User(user_doc) if user_doc else None
+    return user_cache.get(user_id, load)
 
 # Google OAuth blueprint
 google_bp = make_google_blueprint(
@@ -269,10 +209,10 @@ def index():
     session["email"] = email  # optional: store in session for template use
 
     # Lookup or create user
-    user_doc = users_collection.find_one({"email": email})
+    user_doc = users_collection().find_one({"email": email})
     if not user_doc:
-        users_collection.insert_one({"email": email})
-        user_doc = users_collection.find_one({"email": email})
+        users_collection().insert_one({"email": email})
+        user_doc = users_collection().find_one({"email": email})
 
     user = User(user_doc)
     login_user(user)  # Flask-Login
@@ -299,11 +239,11 @@ from flask import request
 
 @app.route("/nfl/players/<int:espn_id>")
 def player_page(espn_id):
-    db   = client["fantasy_football"]
+    db   = fantasy_db()
     pcol = db["players"]
     tcol = db["teams"]
 
-    player = pcol.find_one({"espn_id": espn_id})
+    player = pcol.find_one({"espn_id": espn_id}, {"games": 0})
     if not player:
         return render_template("player_not_found.html", espn_id=espn_id), 404
 
@@ -318,15 +258,10 @@ def player_page(espn_id):
     prop_columns = [k for k, roles in POSITIONS_BY_PROP.items() if role in roles]
     prop_titles  = [k.replace("player_", "").replace("_", " ").title() for k in prop_columns]
 
-    # sort games newest→oldest
-    games = player.get("games", []) or []
-    try:
-        games.sort(
-            key=lambda g: datetime.fromisoformat(g["commence_time"].replace("Z", "+00:00")),
-            reverse=True
-        )
-    except Exception:
-        pass
+    # one page of games, newest→oldest
+    page = max(1, request.args.get("page", 1, type=int) or 1)
+    games, total = games_page(espn_id, page, PLAYER_GAMES_PER_PAGE)
+    pages = max(1, -(-total // PLAYER_GAMES_PER_PAGE))
 
     team_abbrev = (player.get("team") or "").upper()
     rows = []
@@ -357,11 +292,52 @@ def player_page(espn_id):
         team_logo=logo_by_abbrev.get(team_abbrev),
         espn_link=f"https://www.espn.com/nfl/player/_/id/{espn_id}",
         rows=rows,
-        prop_titles=prop_titles
+        prop_titles=prop_titles,
+        page=page,
+        pages=pages,
+        first_index=(page - 1) * PLAYER_GAMES_PER_PAGE,
+    )
+
+@app.route("/nfl/games/<game_id>")
+def game_page(game_id):
+    summary = game_summary(game_id)
+    if not summary:
+        return render_template("game_not_found.html", game_id=game_id), 404
+
+    logo_by_abbrev = logo_map()
+    props = list(POSITIONS_BY_PROP)
+    sides = []
+    for key in ("away", "home"):
+        side = summary["sides"][key]
+        sides.append({
+            "key":     key,
+            "team":    side["team"],
+            "logo":    logo_by_abbrev.get((side["team"] or "").upper()),
+            "players": side["players"],
+            "totals":  side["totals"],
+        })
+
+    return render_template(
+        "game.html",
+        game=summary,
+        sides=sides,
+        props=props,
+        prop_titles=[prop_title(p) for p in props],
     )
 
+@app.route("/api/nfl/games/<game_id>")
+def game_api(game_id):
+    """Both rosters' projections and per-side totals for one game."""
+    summary = game_summary(game_id)
+    if not summary:
+        return jsonify({"error": "Game not found"}), 404
+    summary["game_id"] = summary.pop("_id")
+    summary.pop("commence_at", None)
+    return jsonify(summary)
+
 @app.route("/mlb")
 def mlb():
+    # from python_scripts import the_odds  # pulls in pandas; import here, not at module level, when this comes back
     # batter_rows = []
     # for filename in os.listdir(batters_dir):   
     #     filepath = os.path.join(batters_dir, filename)
@@ -388,29 +364,17 @@ def mlb():
 
 @app.route("/api/nfl/search-index")
 def nfl_search_index():
-    db   = client["fantasy_football"]
-    pcol = db["players"]
+    return jsonify(search_cache.get("all", build_search_index))
 
-    players = pcol.find(
+def build_search_index():
+    players = fantasy_db()["players"].find(
         {"position": {"$in": ["QB", "RB", "WR", "TE"]}},
-        {"name": 1, "espn_id": 1, "team": 1, "position": 1, "games": 1}
+        {"name": 1, "espn_id": 1, "team": 1, "position": 1, "latest_game": 1}
     )
 
-    def iso_to_dt(s):
-        from datetime import datetime
-        try: return datetime.fromisoformat(s.replace("Z", "+00:00"))
-        except: return None
-
     results = []
     for p in players:
-        latest = None
-        games = p.get("games", []) or []
-        if games:
-            gs = sorted(
-                [g for g in games if g.get("commence_time")],
-                key=lambda g: iso_to_dt(g["commence_time"]) or datetime.min
-            )
-            latest = gs[-1] if gs else None
+        latest = get_recent_game(p)
         fantasy = (latest or {}).get("fantasy", {}) or {}
         results.append({
             "name": p["name"],
@@ -419,7 +383,38 @@ def nfl_search_index():
             "position": p.get("position"),
             "fantasy_ppr": round(float(fantasy.get("espn_ppr", 0) or 0), 2),
         })
-    return jsonify(results)
+    return results
+
+
+@app.route("/api/nfl/archive")
+def nfl_archive_weeks():
+    """Archived (season, week) buckets, newest first."""
+    return jsonify(archived_week_list())
+
+
+@app.route("/api/nfl/archive/<int:season>/<int:week>")
+def nfl_archive_week(season, week):
+    """One archived week's player rows; ?espn_id= narrows it to one player."""
+    espn_id = request.args.get("espn_id", type=int)
+    doc = archived_week(season, week, espn_id)
+    if not doc:
+        return jsonify({"error": "Week not archived"}), 404
+    for r in doc.get("rows", []):
+        r.pop("commence_at", None)   # commence_time already carries it, as a string
+    return jsonify(doc)
+
+
+@app.route("/api/nfl/stream")
+def nfl_stream():
+    """
+    Server-Sent Events: per-player projection/fantasy deltas as ingest writes
+    them. A reconnect's Last-Event-ID replays the deltas it missed.
+    """
+    return Response(
+        stream_with_context(sse_stream(request.headers.get("Last-Event-ID"))),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.route("/api/team", methods=["POST"])
@@ -432,6 +427,7 @@ def save_team():
     league_name = str(data.get("leagueName")) if data.get("leagueName") is not None else None
     team_id   = str(data.get("teamId")) if data.get("teamId") is not None else None 
     players   = data.get("players", [])
+    slots     = clean_slots(data["lineupSlots"]) if data.get("lineupSlots") is not None else None
     
     if not email:
         return jsonify({"error": "Missing email"}), 400
@@ -439,9 +435,13 @@ def save_team():
         return jsonify({"error": "Missing teamName"}), 400
     if not league_id or not team_id:
         return jsonify({"error": "Missing leagueId or teamId"}), 400
+    if data.get("lineupSlots") is not None and slots is None:
+        return jsonify({"error": "Invalid lineupSlots"}), 400
+    slot_fields = {"lineupSlots": slots} if slots else {}
+    this_team = {"teams": {"$elemMatch": {"leagueId": league_id, "teamId": team_id}}}
 
     # 1) Try to update existing team (match by leagueId + teamId)
-    res = users_collection.update_one(
+    doc = users_collection().find_one_and_update(
         {"email": email, "teams.leagueId": league_id, "teams.teamId": team_id},
         {"$set": {
             "teams.$.teamName": team_name,
@@ -450,12 +450,18 @@ def save_team():
             "teams.$.leagueName": league_name,
             "teams.$.teamId": team_id,
             "teams.$.players": players,
+            "teams.$.rosterHash": roster_hash(players),
             "teams.$.updatedAt": datetime.now(timezone.utc)
 ,
-        }}
+            **{f"teams.$.{k}": v for k, v in slot_fields.items()},
+        }, "$inc": {"teams.$.rosterVersion": 1, "teamsRev": 1}},
+        projection=this_team,
+        return_document=ReturnDocument.AFTER,
     )
 
-    if res.matched_count > 0:
+    if doc is not None:
+        notify("users")
+        refresh_team_table(email, doc["teams"][0])
         return jsonify({"message": "Team updated"}), 200
 
     # 2) If not found, append new team (and create user doc if needed)
@@ -466,17 +472,242 @@ def save_team():
         "leagueName": league_name,
         "teamId": team_id,
         "players": players,
+        "rosterHash": roster_hash(players),
+        "rosterVersion": 1,
+        **slot_fields,
         "createdAt": datetime.now(timezone.utc),
         "updatedAt": datetime.now(timezone.utc),
     }
 
-    users_collection.update_one(
+    users_collection().update_one(
         {"email": email},
-        {"$push": {"teams": team_entry}},
+        {"$push": {"teams": team_entry}, "$inc": {"teamsRev": 1}},
         upsert=True
     )
+    notify("users")
+    refresh_team_table(email, team_entry)
     return jsonify({"message": "Team added to user"}), 200
 
+
+def team_info_from_payload(data: dict):
+    """Normalized team identity fields from an extension payload, or an error message."""
+    def as_str(key):
+        return str(data.get(key)) if data.get(key) is not None else None
+
+    info = {
+        "teamName":   data.get("teamName"),
+        "seasonId":   as_str("seasonId"),
+        "leagueId":   as_str("leagueId"),
+        "leagueName": as_str("leagueName"),
+        "teamId":     as_str("teamId"),
+    }
+    if not info["teamName"]:
+        return info, "Missing teamName"
+    if not info["leagueId"] or not info["teamId"]:
+        return info, "Missing leagueId or teamId"
+    # only present when sent, so saves without it keep the stored slots
+    if data.get("lineupSlots") is not None:
+        info["lineupSlots"] = clean_slots(data["lineupSlots"])
+        if info["lineupSlots"] is None:
+            return info, "Invalid lineupSlots"
+    return info, None
+
+
+@app.route("/api/team/sync", methods=["POST"])
+def sync_team():
+    """
+    Delta roster sync for the extension.
+
+    Body: the same team fields as /api/team plus
+      hash         – roster_hash of the client's current roster
+      baseVersion  – rosterVersion the add/drop lists were computed against
+      add / drop   – players to add, player keys to drop
+      players      – optional full roster (first sync, or after a 409)
+      lineupSlots  – optional {slot: count} for the lineup optimizer; the
+                     stored slots are kept when it is omitted
+
+    Returns 304 when the stored hash already matches, 409 when baseVersion
+    is stale (client should resend the full roster), else the new version.
+    """
+    data = request.json or {}
+    email = data.get("email")
+    client_hash = data.get("hash")
+
+    if not email:
+        return jsonify({"error": "Missing email"}), 400
+    info, error = team_info_from_payload(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    team_match = {"leagueId": info["leagueId"], "teamId": info["teamId"]}
+    user = users_collection().find_one(
+        {"email": email, "teams": {"$elemMatch": team_match}},
+        {"teams": {"$elemMatch": team_match}}
+    )
+    current = (user or {}).get("teams", [None])[0]
+
+    # Idle refresh: nothing changed since the last sync
+    slots_changed = "lineupSlots" in info and info["lineupSlots"] != (current or {}).get("lineupSlots")
+    if current and client_hash and current.get("rosterHash") == client_hash and not slots_changed:
+        resp = app.response_class(status=304)
+        resp.headers["ETag"] = f'"{current.get("rosterVersion")}"'
+        return resp
+
+    base_version = current.get("rosterVersion") if current else None
+    if "players" in data:
+        players = [clean_player(p) for p in data.get("players") or []]
+    elif current and data.get("baseVersion") == base_version:
+        players = apply_delta(current.get("players", []), data.get("add"), data.get("drop"))
+    else:
+        return jsonify({"error": "Stale baseVersion, resend full roster",
+                        "version": base_version}), 409
+
+    new_hash = roster_hash(players)
+    if client_hash and new_hash != client_hash:
+        return jsonify({"error": "Roster hash mismatch, resend full roster",
+                        "version": base_version}), 409
+
+    now = datetime.now(timezone.utc)
+    fields = {
+        "teamName": info["teamName"],
+        "seasonId": info["seasonId"],
+        "leagueName": info["leagueName"],
+        "players": players,
+        "rosterHash": new_hash,
+        **({"lineupSlots": info["lineupSlots"]} if "lineupSlots" in info else {}),
+        "updatedAt": now,
+    }
+
+    if current:
+        version = (base_version or 0) + 1
+        res = users_collection().update_one(
+            # rosterVersion guards against a concurrent sync of the same team
+            {"email": email, "teams": {"$elemMatch": {**team_match, "rosterVersion": base_version}}},
+            {"$set": {**{f"teams.$.{k}": v for k, v in fields.items()}, "teams.$.rosterVersion": version},
+             "$inc": {"teamsRev": 1}}
+        )
+        if not res.matched_count:
+            return jsonify({"error": "Concurrent update, resend full roster"}), 409
+    else:
+        version = 1
+        users_collection().update_one(
+            {"email": email},
+            {"$push": {"teams": {**team_match, **fields, "rosterVersion": version, "createdAt": now}},
+             "$inc": {"teamsRev": 1}},
+            upsert=True
+        )
+
+    notify("users")
+    refresh_team_table(email, {**(current or {}), **team_match, **fields, "rosterVersion": version})
+    return jsonify({"message": "Team synced", "version": version, "hash": new_hash}), 200
+
+@app.route("/api/teams/bulk", methods=["POST"])
+def save_teams_bulk():
+    """
+    Save every team for one user in a single atomic update of the user document.
+
+    Body: {"email": ..., "teams": [<same fields as /api/team>, ...]}
+    The merged teams array is written with a compare-and-set on teamsRev, so a
+    concurrent single-team save makes us re-read and merge again instead of
+    being overwritten.
+    """
+    data = request.json or {}
+    email = data.get("email")
+    incoming = data.get("teams") or []
+    if not email:
+        return jsonify({"error": "Missing email"}), 400
+    if not isinstance(incoming, list) or not incoming:
+        return jsonify({"error": "Missing teams"}), 400
+
+    parsed = []
+    for t in incoming:
+        info, error = team_info_from_payload(t)
+        if error:
+            return jsonify({"error": error, "team": t.get("teamName")}), 400
+        players = [clean_player(p) for p in t.get("players") or []]
+        parsed.append((info, players))
+
+    for _ in range(BULK_SAVE_RETRIES):
+        user = users_collection().find_one({"email": email}, {"teams": 1, "teamsRev": 1}) or {}
+        rev = user.get("teamsRev")
+        teams = list(user.get("teams") or [])
+        index = {(t.get("leagueId"), t.get("teamId")): i for i, t in enumerate(teams)}
+
+        now = datetime.now(timezone.utc)
+        results = []
+        changed = False
+        for info, players in parsed:
+            key = (info["leagueId"], info["teamId"])
+            new_hash = roster_hash(players)
+            if key in index:
+                cur = teams[index[key]]
+                if cur.get("rosterHash") == new_hash and all(cur.get(k) == v for k, v in info.items()):
+                    results.append({**dict(zip(("leagueId", "teamId"), key)), "status": "unchanged",
+                                    "version": cur.get("rosterVersion"), "hash": new_hash})
+                    continue
+                version = (cur.get("rosterVersion") or 0) + (cur.get("rosterHash") != new_hash)
+                teams[index[key]] = {**cur, **info, "players": players, "rosterHash": new_hash,
+                                     "rosterVersion": version, "updatedAt": now}
+                status = "updated"
+            else:
+                version = 1
+                index[key] = len(teams)
+                teams.append({**info, "players": players, "rosterHash": new_hash,
+                              "rosterVersion": version, "createdAt": now, "updatedAt": now})
+                status = "added"
+            changed = True
+            results.append({**dict(zip(("leagueId", "teamId"), key)), "status": status,
+                            "version": version, "hash": new_hash})
+
+        if not changed:
+            return jsonify({"message": "No changes", "teams": results}), 200
+
+        # Docs written before teamsRev existed (or brand-new users) start at 1
+        bump = {"$inc": {"teamsRev": 1}} if rev is not None else {}
+        try:
+            res = users_collection().update_one(
+                {"email": email, "teamsRev": rev},
+                {"$set": {"teams": teams, **({} if bump else {"teamsRev": 1})}, **bump},
+                upsert=not user
+            )
+        except DuplicateKeyError:
+            # another save created this user first; re-read and merge into theirs
+            continue
+        if res.matched_count or res.upserted_id is not None:
+            notify("users")
+            logos = logo_map()
+            for r in results:
+                if r["status"] != "unchanged":
+                    refresh_team_table(email, teams[index[(r["leagueId"], r["teamId"])]], logos)
+            return jsonify({"message": "Teams saved", "teams": results}), 200
+
+    return jsonify({"error": "Concurrent update, retry"}), 409
+
+@app.route("/api/db/pool")
+@login_required
+def db_pool():
+    # pid, client options and pool stats per Mongo host:port; admins only
+    if not profiling.is_admin(current_user.email):
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(pool_stats())
+
+@app.route("/api/admin/profile-token")
+@login_required
+def profile_token():
+    if not profiling.is_admin(current_user.email):
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify({
+        "token":      profiling.make_token(app.secret_key, current_user.email),
+        "param":      profiling.TOKEN_PARAM,
+        "header":     profiling.TOKEN_HEADER,
+        "expires_in": profiling.PROFILE_TOKEN_MAX_AGE,
+    })
+
+@app.route("/metrics")
+def metrics_endpoint():
+    body, content_type = metrics.render_latest()
+    return Response(body, content_type=content_type)
+
 # Run
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 10000))
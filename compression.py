@@ -0,0 +1,154 @@
+"""
+Response compression and fingerprinted static URLs.
+
+Compression: text responses (HTML, JSON, CSS, JS) of at least
+COMPRESS_MIN_BYTES go out as brotli or gzip, whichever the client prefers
+(brotli only when the `brotli` package is installed). Streamed responses
+(the SSE feed) are left alone.
+
+Bodies from CACHEABLE_ENDPOINTS (the /nfl board, game pages, the search index, archived
+weeks and static files) are the same for every visitor until the data
+changes, so their compressed variants are kept in a byte-bounded LRU keyed
+by a digest of the body: each version is compressed once, at a higher
+level, and served precompressed after that.
+
+Static assets: url_for('static', ...) gains ?v=<content hash>, and requests
+carrying the current hash get a one-year immutable Cache-Control, so
+browsers never revalidate style.css / table.js and a deploy changes the URL.
+Compressed responses carry the encoding in their ETag ("<etag>-gzip"), so
+identity, gzip and brotli bodies never share a validator.
+"""
+import os
+import gzip
+import hashlib
+import threading
+
+from fragments import FragmentCache
+
+try:
+    import brotli
+except ImportError:   # gzip only
+    brotli = None
+
+# ——— CONFIG ———
+COMPRESS_MIN_BYTES   = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+COMPRESS_CACHE_BYTES = int(os.getenv("COMPRESS_CACHE_BYTES", 16 * 1024 * 1024))
+STATIC_MAX_AGE       = 365 * 24 * 3600
+COMPRESSIBLE = {
+    "text/html", "text/css", "text/plain", "text/javascript",
+    "application/javascript", "application/json", "image/svg+xml",
+}
+CACHEABLE_ENDPOINTS = {
+    "nfl", "nfl_search_index", "game_page", "game_api", "nfl_archive_week", "nfl_archive_weeks", "static",
+}
+
+# (dynamic level, cached level) per encoding
+GZIP_LEVELS   = (6, 9)
+BROTLI_LEVELS = (4, 9)
+
+compressed_cache = FragmentCache(COMPRESS_CACHE_BYTES, name="compressed")
+
+
+def encodings():
+    return ["br", "gzip"] if brotli else ["gzip"]
+
+def compress(data: bytes, encoding: str, cached: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_LEVELS[cached])
+    return gzip.compress(data, compresslevel=GZIP_LEVELS[cached], mtime=0)
+
+def compressed_body(data: bytes, encoding: str) -> bytes:
+    """Precompressed variant of a cacheable body, compressing on first use."""
+    key = (hashlib.blake2b(data, digest_size=16).digest(), encoding)
+    out = compressed_cache.get(key)
+    if out is None:
+        out = compress(data, encoding, cached=True)
+        compressed_cache.put(key, out)
+    return out
+
+
+# ——— static fingerprints ———
+
+_hash_lock = threading.Lock()
+_hashes = {}   # path → (mtime_ns, size, hash)
+
+def file_hash(path):
+    """Short content hash of a file, recomputed only when its mtime or size changes."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    cached = _hashes.get(path)
+    if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    with open(path, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:12]
+    with _hash_lock:
+        _hashes[path] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+def static_body(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def init_app(app):
+    from flask import request
+
+    def static_path(filename):
+        return os.path.join(app.static_folder, filename) if filename else None
+
+    @app.url_defaults
+    def _fingerprint_static(endpoint, values):
+        if endpoint == "static" and "filename" in values and "v" not in values:
+            digest = file_hash(static_path(values["filename"]))
+            if digest:
+                values["v"] = digest
+
+    @app.after_request
+    def _compress(response):
+        is_static = request.endpoint == "static"
+        if is_static and response.status_code in (200, 304):
+            filename = (request.view_args or {}).get("filename")
+            if request.args.get("v") and request.args.get("v") == file_hash(static_path(filename)):
+                response.cache_control.no_cache = None   # send_file's default
+                response.cache_control.public = True
+                response.cache_control.max_age = STATIC_MAX_AGE
+                response.cache_control.immutable = True
+
+        if (response.status_code != 200
+                or response.is_streamed and not is_static
+                or "Content-Encoding" in response.headers
+                or response.mimetype not in COMPRESSIBLE):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(encodings())
+        if not encoding:
+            return response
+
+        if is_static:
+            # send_file streams from disk; read the (small) asset so it can be compressed
+            data = static_body(static_path(request.view_args["filename"]))
+            if len(data) >= COMPRESS_MIN_BYTES and hasattr(response.response, "close"):
+                response.response.close()
+        else:
+            data = response.get_data()
+        if len(data) < COMPRESS_MIN_BYTES:
+            return response
+
+        if request.endpoint in CACHEABLE_ENDPOINTS:
+            body = compressed_body(data, encoding)
+        else:
+            body = compress(data, encoding)
+        response.direct_passthrough = False
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        # each encoding is a different representation, so it needs its own
+        # validator (RFC 9110 8.8.3); re-check If-None-Match against it
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak)
+            if request.if_none_match:
+                response.make_conditional(request)
+        return response
@@ -1,5 +1,150 @@
-from pymongo import MongoClient
+"""
+Shared MongoDB connection for app.py and everything under python_scripts/.
 
-client = MongoClient("mongodb://localhost:27017/")
-db = client["fantasydb"]
-users = db["users"]
\ No newline at end of file
+The client is created lazily, once per process, and dropped in forked
+children (gunicorn --preload forks after the app module is imported, and
+a MongoClient must never be shared across fork()). Scripts should be run
+from the repo root with `python -m ...` so this module is importable.
+"""
+import os
+import threading
+from collections import defaultdict
+from pymongo import MongoClient, monitoring
+
+from metrics import command_metrics
+
+# ——— CONFIG ———
+MONGO_URI                   = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
+MAX_POOL_SIZE               = int(os.getenv("MONGO_MAX_POOL_SIZE", 50))
+MIN_POOL_SIZE               = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MAX_IDLE_TIME_MS            = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 60000))
+CONNECT_TIMEOUT_MS          = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+SOCKET_TIMEOUT_MS           = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 0)) or None
+WAIT_QUEUE_TIMEOUT_MS       = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 0)) or None
+# primary | primaryPreferred | secondary | secondaryPreferred | nearest
+READ_PREFERENCE             = os.getenv("MONGO_READ_PREFERENCE", "primary")
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection-pool counters per server, read through pool_stats()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: defaultdict(int))
+
+    def _inc(self, event, key, n=1):
+        with self._lock:
+            self._stats[f"{event.address[0]}:{event.address[1]}"][key] += n
+
+    def pool_created(self, event):             self._inc(event, "pools_created")
+    def pool_ready(self, event):               pass
+    def pool_cleared(self, event):             self._inc(event, "pools_cleared")
+    def pool_closed(self, event):              self._inc(event, "pools_closed")
+    def connection_created(self, event):       self._inc(event, "connections_created")
+    def connection_ready(self, event):         pass
+    def connection_closed(self, event):        self._inc(event, "connections_closed")
+    def connection_check_out_started(self, event): pass
+    def connection_check_out_failed(self, event):  self._inc(event, "checkout_failures")
+    def connection_checked_out(self, event):   self._inc(event, "checkouts")
+    def connection_checked_in(self, event):    self._inc(event, "checkins")
+
+    def snapshot(self):
+        with self._lock:
+            out = {}
+            for server, s in self._stats.items():
+                s = dict(s)
+                s["open"]   = s.get("connections_created", 0) - s.get("connections_closed", 0)
+                s["in_use"] = s.get("checkouts", 0) - s.get("checkins", 0)
+                out[server] = s
+            return out
+
+
+_lock    = threading.Lock()
+_client  = None
+_metrics = PoolMetrics()
+
+
+def _reset_after_fork():
+    # The parent's sockets and monitor threads are unusable here; start fresh
+    global _lock, _client, _metrics
+    _lock    = threading.Lock()
+    _client  = None
+    _metrics = PoolMetrics()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def client_options() -> dict:
+    opts = {
+        "maxPoolSize":              MAX_POOL_SIZE,
+        "minPoolSize":              MIN_POOL_SIZE,
+        "maxIdleTimeMS":            MAX_IDLE_TIME_MS,
+        "connectTimeoutMS":         CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS":          SOCKET_TIMEOUT_MS,
+        "waitQueueTimeoutMS":       WAIT_QUEUE_TIMEOUT_MS,
+        "readPreference":           READ_PREFERENCE,
+    }
+    return {k: v for k, v in opts.items() if v is not None}
+
+
+def get_client() -> MongoClient:
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = MongoClient(MONGO_URI, event_listeners=[_metrics, command_metrics], **client_options())
+    return _client
+
+
+def get_db(name: str):
+    return get_client()[name]
+
+
+def close_client():
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def pool_stats() -> dict:
+    return {
+        "pid":     os.getpid(),
+        "options": client_options(),
+        "servers": _metrics.snapshot(),
+    }
+
+
+def replace_collection(db_name: str, name: str, docs, indexes=None, batch_size: int = 1000) -> int:
+    """
+    Swap in a complete new copy of a collection without readers ever seeing it
+    empty or half-written: docs go into <name>__staging, indexes are built
+    there, then renameCollection with dropTarget replaces the live one in a
+    single step. An empty docs iterable leaves the live collection untouched.
+    """
+    db = get_db(db_name)
+    staging = db[f"{name}__staging"]
+    staging.drop()   # leftovers from an interrupted reload
+
+    n, batch = 0, []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            staging.insert_many(batch, ordered=False)
+            n += len(batch)
+            batch = []
+    if batch:
+        staging.insert_many(batch, ordered=False)
+        n += len(batch)
+
+    if not n:
+        staging.drop()
+        return 0
+    if indexes:
+        staging.create_indexes(indexes)
+    staging.rename(name, dropTarget=True)
+    return n
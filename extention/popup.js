@@ -25,6 +25,82 @@ document.addEventListener("DOMContentLoaded", () => {
     output.innerHTML = `<b>Error:</b> ${msg}`;
   };
 
+  const API_BASE = "http://localhost:10000";
+
+  // Same canonical roster form as rosters.py on the server:
+  // SHA-256 of [[espnId, name, team], ...] sorted by player key.
+  const playerKey = (p) => (p.espnId ? String(p.espnId) : `${p.name}|${p.team}`);
+  const cleanPlayer = (p) => ({
+    espnId: p.espnId ? String(p.espnId) : null,
+    name: p.name ?? null,
+    team: (p.team || "").toUpperCase() || null,
+  });
+
+  async function rosterHash(players) {
+    const rows = players
+      .map(cleanPlayer)
+      .sort((a, b) => {
+        const ka = playerKey(a), kb = playerKey(b);
+        return ka < kb ? -1 : ka > kb ? 1 : 0;
+      })
+      .map((p) => [p.espnId, p.name, p.team]);
+    const buf = await crypto.subtle.digest("SHA-256", new TextEncoder().encode(JSON.stringify(rows)));
+    return [...new Uint8Array(buf)].map((b) => b.toString(16).padStart(2, "0")).join("");
+  }
+
+  // Send only add/drop deltas against the last synced roster version.
+  // Unchanged rosters come back as 304; a stale version (409) falls back to the full roster.
+  async function syncTeam(email, team) {
+    const key = `roster:${team.leagueId}:${team.teamId}`;
+    const players = (team.players || []).map(cleanPlayer);
+    const hash = await rosterHash(players);
+    const saved = (await chrome.storage.local.get(key))[key];
+
+    const base = {
+      teamName: team.teamName,
+      email,
+      seasonId: team.seasonId,
+      leagueId: team.leagueId,
+      leagueName: team.leagueName,
+      teamId: team.teamId,
+      hash,
+    };
+
+    let body = { ...base, players };
+    if (saved) {
+      const before = new Map(saved.players.map((p) => [playerKey(p), p]));
+      const now = new Set(players.map(playerKey));
+      body = {
+        ...base,
+        baseVersion: saved.version,
+        add: players.filter((p) => !before.has(playerKey(p))),
+        drop: [...before.keys()].filter((k) => !now.has(k)),
+      };
+    }
+
+    const post = (b) => fetch(`${API_BASE}/api/team/sync`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(b),
+    });
+
+    let res = await post(body);
+    if (res.status === 409) res = await post({ ...base, players });
+
+    if (res.status === 304) {
+      const version = parseInt((res.headers.get("ETag") || "").replace(/"/g, ""), 10);
+      if (!saved && Number.isFinite(version)) {
+        await chrome.storage.local.set({ [key]: { version, hash, players } });
+      }
+      return { status: "unchanged" };
+    }
+    if (!res.ok) throw new Error(`sync failed (${res.status})`);
+
+    const out = await res.json();
+    await chrome.storage.local.set({ [key]: { version: out.version, hash: out.hash, players } });
+    return { status: "synced", version: out.version };
+  }
+
   // Send a message; if no receiver, inject content.js and retry once.
   function sendToContent(tabId, message) {
     return new Promise((resolve, reject) => {
@@ -52,6 +128,83 @@ document.addEventListener("DOMContentLoaded", () => {
     });
   }
 
+  // Google account email via the extension's OAuth token
+  function getUserEmail() {
+    return new Promise((resolve, reject) => {
+      chrome.identity.getAuthToken({ interactive: true }, (token) => {
+        if (chrome.runtime.lastError || !token) return reject(new Error("Google auth error"));
+        fetch("https://www.googleapis.com/oauth2/v3/userinfo", {
+          headers: { Authorization: "Bearer " + token },
+        })
+          .then((r) => r.json())
+          .then((userInfo) => resolve(userInfo.email))
+          .catch(() => reject(new Error("Google auth error")));
+      });
+    });
+  }
+
+  // Scrape every open roster tab and save all teams in one request.
+  document.getElementById("syncAllBtn").addEventListener("click", async () => {
+    const tabs = await chrome.tabs.query({ url: "*://fantasy.espn.com/football/team*" });
+    const rosterTabs = tabs.filter((t) => {
+      try { return isRosterUrl(new URL(t.url)); } catch { return false; }
+    });
+    if (!rosterTabs.length) {
+      showRosterHint("(Tip: open each league’s roster page in its own tab, then sync all.)");
+      return;
+    }
+
+    output.textContent = `Reading ${rosterTabs.length} roster tab(s)…`;
+    const scraped = await Promise.allSettled(
+      rosterTabs.map((t) => sendToContent(t.id, { action: "getTeamName" }))
+    );
+    const teams = scraped
+      .filter((r) => r.status === "fulfilled" && r.value?.teamName && r.value.players?.length)
+      .map((r) => ({ ...r.value, players: r.value.players.map(cleanPlayer) }));
+    if (!teams.length) {
+      showActualError("No rosters detected in the open tabs. Try refreshing them.");
+      return;
+    }
+
+    let email;
+    try {
+      email = await getUserEmail();
+    } catch (e) {
+      showActualError(e.message);
+      return;
+    }
+
+    try {
+      const res = await fetch(`${API_BASE}/api/teams/bulk`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          email,
+          teams: teams.map(({ teamName, seasonId, leagueId, leagueName, teamId, players }) =>
+            ({ teamName, seasonId, leagueId, leagueName, teamId, players })),
+        }),
+      });
+      if (!res.ok) throw new Error(`sync failed (${res.status})`);
+      const out = await res.json();
+
+      // Keep the per-team delta state in step with what the server stored
+      const byKey = new Map(teams.map((t) => [`roster:${t.leagueId}:${t.teamId}`, t]));
+      const state = {};
+      for (const r of out.teams || []) {
+        const key = `roster:${r.leagueId}:${r.teamId}`;
+        if (byKey.has(key)) state[key] = { version: r.version, hash: r.hash, players: byKey.get(key).players };
+      }
+      await chrome.storage.local.set(state);
+
+      const changed = (out.teams || []).filter((r) => r.status !== "unchanged").length;
+      output.innerHTML =
+        `Synced <a href="${API_BASE}/teams" target="_blank" style="color: #4dabf7;">${teams.length} team(s)</a>` +
+        `<br/><small>${changed} changed, ${teams.length - changed} unchanged.</small>`;
+    } catch (e) {
+      showActualError(`Could not save teams (${e.message}).`);
+    }
+  });
+
   document.getElementById("getTeamNameBtn").addEventListener("click", async () => {
     const [tab] = await chrome.tabs.query({ active: true, currentWindow: true });
     if (!tab || !tab.url) {
@@ -86,35 +239,24 @@ document.addEventListener("DOMContentLoaded", () => {
       }
 
       // === Success flow (auth + POST) ===
-      chrome.identity.getAuthToken({ interactive: true }, (token) => {
-        if (chrome.runtime.lastError || !token) {
-          showActualError("Google auth error");
-          return;
-        }
-        fetch("https://www.googleapis.com/oauth2/v3/userinfo", {
-          headers: { Authorization: "Bearer " + token },
-        })
-          .then((r) => r.json())
-          .then((userInfo) => {
-            fetch("http://localhost:10000/api/team", {
-              method: "POST",
-              headers: { "Content-Type": "application/json" },
-              body: JSON.stringify({
-                teamName: response.teamName,
-                email: userInfo.email,
-                seasonId: response.seasonId,
-                leagueId: response.leagueId,
-                leagueName: response.leagueName,
-                teamId: response.teamId,
-                players: response.players || [],
-              }),
-            });
-            output.innerHTML =
-              `Team: <a href="http://localhost:10000/teams" target="_blank" style="color: #4dabf7;">${response.teamName}</a><br/>` +
-              `Players captured: ${response.players.length}`;
-          })
-          .catch(() => showActualError("Google auth error"));
-      });
+      let email;
+      try {
+        email = await getUserEmail();
+      } catch (e) {
+        showActualError(e.message);
+        return;
+      }
+      let result;
+      try {
+        result = await syncTeam(email, response);
+      } catch (e) {
+        showActualError(`Could not save team (${e.message}).`);
+        return;
+      }
+      output.innerHTML =
+        `Team: <a href="${API_BASE}/teams" target="_blank" style="color: #4dabf7;">${response.teamName}</a><br/>` +
+        `Players captured: ${response.players.length}` +
+        (result.status === "unchanged" ? "<br/><small>Roster unchanged since last sync.</small>" : "");
     } catch (err) {
       // Messaging failed twice (even after injection)
       if (isRosterUrl(url)) {
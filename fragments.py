@@ -0,0 +1,66 @@
+"""
+Bounded LRU cache for rendered HTML fragments.
+
+/nfl renders the same four position tables for every visitor until ingest
+changes the data, so each table's HTML is cached under a key that includes
+the data version (updates.data_version()). A bump makes every old key miss;
+the stale entries are never read again and age out through LRU eviction.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from metrics import FRAGMENT_LOOKUPS
+
+# ——— CONFIG ———
+FRAGMENT_CACHE_BYTES = int(os.getenv("FRAGMENT_CACHE_BYTES", 32 * 1024 * 1024))
+
+
+class FragmentCache:
+    """
+    Thread-safe LRU keyed by tuple, bounded by total size of the values
+    (UTF-8 length for str, length for bytes). `name` labels its lookups.
+    """
+
+    def __init__(self, max_bytes=FRAGMENT_CACHE_BYTES, name="fragments"):
+        self.max_bytes = max_bytes
+        self.name = name
+        self._lock = threading.Lock()
+        self._items = OrderedDict()   # key → (value, size)
+        self._bytes = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                FRAGMENT_LOOKUPS.labels(self.name, "miss").inc()
+                return None
+            self._items.move_to_end(key)
+        FRAGMENT_LOOKUPS.labels(self.name, "hit").inc()
+        return item[0]
+
+    def put(self, key, html):
+        size = len(html) if isinstance(html, bytes) else len(html.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._items[key] = (html, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+fragment_cache = FragmentCache()
@@ -0,0 +1,375 @@
+"""
+Per-player game rows in fantasy_football.player_games.
+
+One document per (espn_id, game_id) holding that game's projections and
+fantasy totals, instead of an ever-growing `games` array on the player:
+
+    {espn_id, game_id, commence_time, commence_at, home_team, away_team,
+     projections: {...}, fantasy: {...}, fantasy_updated_at}
+
+commence_time stays the ISO string the odds feed sends (templates slice it);
+commence_at is the parsed datetime the indexes and sorts use. Every row is
+also tagged with its NFL season and week (season_week), so archival can
+target one week through the (season, week) index.
+
+The board only ever shows a player's most recent game, so ingest copies that
+row onto the player as `latest_game` (refresh_latest_games) and the board
+reads players alone; that copy is the hot read path, and player pages read
+player_games, which archival keeps down to the last HOT_WEEKS weeks.
+
+Each game also has a precomputed matchup document in game_summaries (both
+rosters' rows plus per-side totals per prop and scoring profile), rebuilt by
+ingest for the games it touched, so /nfl/games/<game_id> is one _id lookup.
+
+Completed weeks are moved out of player_games into player_games_archive,
+one compact bucket per (season, week) holding that week's rows
+(archive_weeks), so the hot collection stays roughly one week's size however
+much history accumulates. games_page reads through to the archive.
+Summaries of archived games leave game_summaries too; game_summary builds
+them from the bucket on request without storing them.
+"""
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from pymongo import ReplaceOne, UpdateOne
+
+from db import get_db
+from tables import refresh_tables_for_players
+from updates import bump_data_version
+
+DB_NAME           = "fantasy_football"
+PLAYER_GAMES_COLL = "player_games"
+ARCHIVE_COLL      = "player_games_archive"
+SUMMARY_COLL      = "game_summaries"
+
+# NFL weeks run Tuesday–Monday, US Eastern (a Monday night game ends its week)
+NFL_TZ    = ZoneInfo("America/New_York")
+HOT_WEEKS = 2   # current week plus the one before stay in player_games
+
+# Fields dropped from archived rows
+ARCHIVE_DROP = ("_id", "fantasy_updated_at", "season", "week")
+
+
+def player_games_collection():
+    return get_db(DB_NAME)[PLAYER_GAMES_COLL]
+
+def archive_collection():
+    return get_db(DB_NAME)[ARCHIVE_COLL]
+
+def game_summaries_collection():
+    return get_db(DB_NAME)[SUMMARY_COLL]
+
+def parse_commence(s):
+    try:
+        return datetime.fromisoformat(s.replace("Z", "+00:00")).astimezone(timezone.utc)
+    except Exception:
+        return None
+
+def season_week(dt):
+    """
+    (season, week) for a kickoff time. Week 1 starts the Tuesday after Labor
+    Day; preseason is week 0 and January/February games belong to the previous
+    season (playoffs are weeks 19+).
+    """
+    if dt is None:
+        return None, None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    local  = dt.astimezone(NFL_TZ).date()
+    season = local.year if local.month >= 3 else local.year - 1
+    sept1  = date(season, 9, 1)
+    labor  = sept1 + timedelta(days=(7 - sept1.weekday()) % 7)
+    week   = (local - (labor + timedelta(days=1))).days // 7 + 1
+    return season, max(week, 0)
+
+def current_season_week(now=None):
+    return season_week(now or datetime.now(timezone.utc))
+
+def game_tags(commence_time) -> dict:
+    """commence_at, season and week for a commence_time string."""
+    at = parse_commence(commence_time or "")
+    season, week = season_week(at)
+    return {"commence_at": at, "season": season, "week": week}
+
+def upsert_game_op(espn_id, record: dict) -> UpdateOne:
+    """Upsert one player's row for one game (record: game_id, commence_time, teams, projections...)."""
+    fields = {k: v for k, v in record.items() if k not in ("espn_id", "game_id", "_id")}
+    if "commence_time" in fields:
+        fields.update(game_tags(fields["commence_time"]))
+    return UpdateOne(
+        {"espn_id": espn_id, "game_id": record["game_id"]},
+        {"$set": fields},
+        upsert=True,
+    )
+
+def latest_games(espn_ids) -> dict:
+    """Most recent game row per player, keyed by espn_id."""
+    ids = list(espn_ids)
+    if not ids:
+        return {}
+    pipeline = [
+        {"$match": {"espn_id": {"$in": ids}, "commence_at": {"$ne": None}}},
+        {"$sort": {"espn_id": 1, "commence_at": -1}},
+        {"$group": {"_id": "$espn_id", "game": {"$first": "$$ROOT"}}},
+    ]
+    return {d["_id"]: d["game"] for d in player_games_collection().aggregate(pipeline)}
+
+def refresh_latest_games(espn_ids=None) -> int:
+    """Copy each player's most recent game row onto players.latest_game."""
+    coll = player_games_collection()
+    ids = coll.distinct("espn_id") if espn_ids is None else list(espn_ids)
+    if not ids:
+        return 0
+    latest = latest_games(ids)
+    ops = []
+    for eid in ids:
+        game = latest.get(eid)
+        if game is None:
+            ops.append(UpdateOne({"espn_id": eid}, {"$unset": {"latest_game": ""}}))
+        else:
+            game = {k: v for k, v in game.items() if k not in ("_id", "espn_id")}
+            ops.append(UpdateOne({"espn_id": eid}, {"$set": {"latest_game": game}}))
+    get_db(DB_NAME)["players"].bulk_write(ops, ordered=False)
+    return len(ops)
+
+def games_page(espn_id, page: int = 1, per_page: int = 20):
+    """
+    (rows newest first, total count) for one page of a player's games: hot
+    rows first, then archived weeks once the page runs past them.
+    """
+    coll = player_games_collection()
+    page = max(1, int(page))
+    skip = (page - 1) * per_page
+    hot_total = coll.count_documents({"espn_id": espn_id})
+    # one row per player per archived week, so buckets holding the player = rows
+    archived_total = archive_collection().count_documents({"rows.espn_id": espn_id})
+
+    rows = []
+    if skip < hot_total:
+        rows = list(
+            coll.find({"espn_id": espn_id}, {"_id": 0})
+                .sort([("commence_at", -1)])
+                .skip(skip)
+                .limit(per_page)
+        )
+    if len(rows) < per_page and archived_total:
+        rows += archived_rows(espn_id, max(0, skip - hot_total), per_page - len(rows))
+    return rows, hot_total + archived_total
+
+
+# ——— per-game summaries ———
+
+def _side_totals(players: list) -> dict:
+    projections, fantasy = {}, {}
+    for p in players:
+        for k, v in (p.get("projections") or {}).items():
+            projections[k] = projections.get(k, 0.0) + float(v or 0)
+        for k, v in (p.get("fantasy") or {}).items():
+            fantasy[k] = fantasy.get(k, 0.0) + float(v or 0)
+    return {
+        "players":     len(players),
+        "projections": {k: round(v, 2) for k, v in sorted(projections.items())},
+        "fantasy":     {k: round(v, 2) for k, v in sorted(fantasy.items())},
+    }
+
+def build_game_summary(game_id, rows: list, players_by_id: dict):
+    """Matchup document for one game from its player_games rows and player docs."""
+    if not rows:
+        return None
+    first = rows[0]
+    home, away = first.get("home_team"), first.get("away_team")
+    sides = {"home": [], "away": []}
+    for r in rows:
+        p = players_by_id.get(r.get("espn_id")) or {}
+        team = (p.get("team") or "").upper()
+        side = "home" if team == home else "away" if team == away else None
+        if side is None:
+            continue   # traded or unresolved player; can't place them on a side
+        sides[side].append({
+            "espn_id":     r.get("espn_id"),
+            "name":        p.get("name"),
+            "position":    p.get("position"),
+            "projections": r.get("projections") or {},
+            "fantasy":     r.get("fantasy") or {},
+        })
+    for players in sides.values():
+        players.sort(key=lambda x: -float((x["fantasy"] or {}).get("espn_ppr", 0) or 0))
+    return {
+        "_id":           game_id,
+        "commence_time": first.get("commence_time"),
+        "commence_at":   first.get("commence_at"),
+        "season":        first.get("season"),
+        "week":          first.get("week"),
+        "home_team":     home,
+        "away_team":     away,
+        "sides": {
+            side: {"team": home if side == "home" else away, "players": players, "totals": _side_totals(players)}
+            for side, players in sides.items()
+        },
+        "updated_at": datetime.now(timezone.utc),
+    }
+
+def _archived_game_rows(game_ids) -> list:
+    """Archived rows of these games, with their bucket's season/week put back."""
+    return [{**d["row"], "season": d["season"], "week": d["week"]} for d in archive_collection().aggregate([
+        {"$match": {"game_ids": {"$in": game_ids}}},
+        {"$unwind": "$rows"},
+        {"$match": {"rows.game_id": {"$in": game_ids}}},
+        {"$project": {"_id": 0, "season": 1, "week": 1, "row": "$rows"}},
+    ])]
+
+def _build_summaries(rows_by_game: dict) -> list:
+    espn_ids = {r.get("espn_id") for rows in rows_by_game.values() for r in rows}
+    players_by_id = {
+        p["espn_id"]: p
+        for p in get_db(DB_NAME)["players"].find(
+            {"espn_id": {"$in": list(espn_ids)}}, {"_id": 0, "espn_id": 1, "name": 1, "team": 1, "position": 1})
+    }
+    docs = (build_game_summary(gid, rows, players_by_id) for gid, rows in rows_by_game.items())
+    return [d for d in docs if d]
+
+def refresh_game_summaries(game_ids=None, batch_size: int = 200) -> int:
+    """Rebuild the matchup documents for these games (all hot games when None)."""
+    coll = player_games_collection()
+    ids = coll.distinct("game_id") if game_ids is None else [g for g in set(game_ids) if g]
+    n = 0
+    for i in range(0, len(ids), batch_size):
+        batch = ids[i:i + batch_size]
+        rows_by_game = {}
+        for r in coll.find({"game_id": {"$in": batch}}, {"_id": 0}):
+            rows_by_game.setdefault(r["game_id"], []).append(r)
+        ops = [ReplaceOne({"_id": d["_id"]}, d, upsert=True) for d in _build_summaries(rows_by_game)]
+        if ops:
+            game_summaries_collection().bulk_write(ops, ordered=False)
+            n += len(ops)
+    return n
+
+def game_summary(game_id):
+    """
+    The matchup document for a game, built on first request if ingest hasn't
+    yet. Archived games are built from their bucket and not stored, so
+    game_summaries stays the size of the hot window.
+    """
+    doc = game_summaries_collection().find_one({"_id": game_id})
+    if doc is None and refresh_game_summaries([game_id]):
+        doc = game_summaries_collection().find_one({"_id": game_id})
+    if doc is None:
+        rows = _archived_game_rows([game_id])
+        docs = _build_summaries({game_id: rows}) if rows else []
+        doc = docs[0] if docs else None
+    return doc
+
+
+# ——— archive ———
+
+def tag_untagged_rows() -> int:
+    """Backfill season/week on rows written before ingest tagged them."""
+    coll = player_games_collection()
+    ops, n = [], 0
+    for g in coll.find({"season": {"$exists": False}}, {"commence_time": 1, "commence_at": 1}):
+        season, week = season_week(g.get("commence_at") or parse_commence(g.get("commence_time") or ""))
+        ops.append(UpdateOne({"_id": g["_id"]}, {"$set": {"season": season, "week": week}}))
+        n += 1
+        if len(ops) >= 1000:
+            coll.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        coll.bulk_write(ops, ordered=False)
+    return n
+
+def archivable_weeks(now=None, hot_weeks: int = HOT_WEEKS) -> list:
+    """(season, week) pairs in player_games older than the hot window."""
+    season, week = current_season_week(now)
+    pairs = player_games_collection().aggregate([
+        {"$match": {"season": {"$ne": None}}},
+        {"$group": {"_id": {"season": "$season", "week": "$week"}}},
+    ])
+    cutoff = (season, week - hot_weeks + 1)
+    return sorted(
+        (p["_id"]["season"], p["_id"]["week"]) for p in pairs
+        if (p["_id"]["season"], p["_id"]["week"]) < cutoff
+    )
+
+def archive_week(season: int, week: int) -> int:
+    """
+    Move one week's rows into its archive bucket. The bucket is written before
+    the hot rows are deleted, and rows merge by (espn_id, game_id), so a crash
+    or a re-run never loses or duplicates anything.
+    """
+    coll    = player_games_collection()
+    archive = archive_collection()
+    rows = list(coll.find({"season": season, "week": week}))
+    if not rows:
+        return 0
+
+    bucket = archive.find_one({"season": season, "week": week}, {"rows": 1}) or {}
+    merged = {(r.get("espn_id"), r.get("game_id")): r for r in bucket.get("rows", [])}
+    for r in rows:
+        merged[(r.get("espn_id"), r.get("game_id"))] = {k: v for k, v in r.items() if k not in ARCHIVE_DROP}
+    archived = sorted(merged.values(), key=lambda r: (r.get("commence_at") or datetime.min, str(r.get("espn_id"))))
+
+    archive.update_one(
+        {"season": season, "week": week},
+        {"$set": {
+            "rows":        archived,
+            "n_rows":      len(archived),
+            "game_ids":    sorted({r.get("game_id") for r in archived if r.get("game_id")}),
+            "archived_at": datetime.now(timezone.utc),
+        }},
+        upsert=True,
+    )
+    coll.delete_many({"_id": {"$in": [r["_id"] for r in rows]}})
+    return len(rows)
+
+def archive_weeks(now=None, hot_weeks: int = HOT_WEEKS) -> dict:
+    """
+    Archive every week older than the hot window; returns {(season, week): rows moved}.
+    Afterwards the moved players' latest_game and the team tables holding
+    them are rebuilt, the moved games' summaries are dropped (game_summary
+    builds them from the archive on request) and the data version bumped,
+    so nothing keeps pointing at rows that left player_games.
+    """
+    tag_untagged_rows()
+    weeks = archivable_weeks(now, hot_weeks)
+    if not weeks:
+        return {}
+    coll  = player_games_collection()
+    query = {"$or": [{"season": s, "week": w} for s, w in weeks]}
+    espn_ids = coll.distinct("espn_id", query)
+    game_ids = coll.distinct("game_id", query)
+
+    moved = {sw: archive_week(*sw) for sw in weeks}
+    if any(moved.values()):
+        refresh_latest_games(espn_ids)
+        refresh_tables_for_players(espn_ids)
+        game_summaries_collection().delete_many({"_id": {"$in": game_ids}})
+        bump_data_version("archive_weeks")
+    return moved
+
+def archived_week_list() -> list:
+    return list(archive_collection().find(
+        {}, {"_id": 0, "season": 1, "week": 1, "n_rows": 1, "archived_at": 1},
+    ).sort([("season", -1), ("week", -1)]))
+
+def archived_week(season: int, week: int, espn_id=None):
+    """An archived week's rows (optionally one player's), or None if not archived."""
+    if espn_id is None:
+        return archive_collection().find_one({"season": season, "week": week}, {"_id": 0})
+    docs = list(archive_collection().aggregate([
+        {"$match": {"season": season, "week": week}},
+        {"$project": {"_id": 0, "season": 1, "week": 1, "archived_at": 1, "rows": {
+            "$filter": {"input": "$rows", "as": "r", "cond": {"$eq": ["$$r.espn_id", espn_id]}},
+        }}},
+    ]))
+    return docs[0] if docs else None
+
+def archived_rows(espn_id, skip: int = 0, limit: int = 20) -> list:
+    """One player's archived rows, newest week first."""
+    return [d["row"] for d in archive_collection().aggregate([
+        {"$match": {"rows.espn_id": espn_id}},
+        {"$sort": {"season": -1, "week": -1}},
+        {"$unwind": "$rows"},
+        {"$match": {"rows.espn_id": espn_id}},
+        {"$skip": skip},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "row": "$rows"}},
+    ])]
@@ -0,0 +1,150 @@
+"""
+Index declarations for every collection the app and scripts touch, plus
+query-plan checks for the hot query shapes.
+
+    python indexes.py            # create missing indexes, then explain every shape
+    python indexes.py --check    # explain only; exit 1 on any collection scan
+
+ensure_indexes() is idempotent (createIndexes is a no-op for an index that
+already exists with the same keys and options), so it is also safe to run at
+app startup with ENSURE_INDEXES=1.
+"""
+import sys
+import argparse
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from db import get_db
+
+FANTASY = "fantasy_football"
+USERS   = "user_data"
+
+# (db, collection) → indexes. Names are left to Mongo's default so these
+# line up with indexes created elsewhere (get_roster.fetch_team_info).
+INDEXES = {
+    (FANTASY, "players"): [
+        # the board, load_data's name index and generate_data's roster preload filter on position
+        IndexModel([("position", ASCENDING), ("team", ASCENDING)]),
+        # roster sync, player page, team tables, latest_game refresh
+        IndexModel([("espn_id", ASCENDING)]),
+        IndexModel([("name", ASCENDING)]),
+    ],
+    (FANTASY, "player_games"): [
+        # load_data upserts; one row per player per game
+        IndexModel([("espn_id", ASCENDING), ("game_id", ASCENDING)], unique=True),
+        # player page pages and latest-game lookups
+        IndexModel([("espn_id", ASCENDING), ("commence_at", DESCENDING)]),
+        # everyone in one game
+        IndexModel([("game_id", ASCENDING)]),
+        # one week's rows (current-week reads, archival)
+        IndexModel([("season", ASCENDING), ("week", ASCENDING)]),
+    ],
+    (FANTASY, "player_games_archive"): [
+        # one bucket per completed week
+        IndexModel([("season", ASCENDING), ("week", ASCENDING)], unique=True),
+        # player page history past the hot weeks
+        IndexModel([("rows.espn_id", ASCENDING)]),
+    ],
+    (FANTASY, "teams"): [
+        IndexModel([("season", ASCENDING), ("team_id", ASCENDING)], unique=True),
+    ],
+    (FANTASY, "team_tables"): [
+        IndexModel([("email", ASCENDING), ("leagueId", ASCENDING), ("teamId", ASCENDING)], unique=True),
+        IndexModel([("espn_ids", ASCENDING)]),
+    ],
+    # Rebuilt wholesale by python_scripts/nflscrape.py (indexes go on the staging copy)
+    ("nfl_data", "nfl_players"): [
+        IndexModel([("espn_id", ASCENDING)]),
+        IndexModel([("player_id", ASCENDING)]),
+    ],
+    # Every teams.* lookup also filters on email, and a user has a handful of
+    # teams, so the unique email index is all the users collection needs.
+    (USERS, "users"): [
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+}
+
+# Query shapes from app.py, tables.py and the scripts. Whole-collection reads
+# of small lookup collections are expected to scan and are marked as such.
+QUERY_SHAPES = [
+    # app.py
+    {"name": "nfl board",           "db": FANTASY, "coll": "players", "filter": {"position": {"$in": ["QB", "RB", "WR", "TE"]}}},
+    {"name": "player page",         "db": FANTASY, "coll": "players", "filter": {"espn_id": 0}},
+    {"name": "logo map",            "db": FANTASY, "coll": "teams",   "filter": {}, "allow_collscan": True},
+    {"name": "user by email",       "db": USERS,   "coll": "users",   "filter": {"email": ""}},
+    {"name": "team save",           "db": USERS,   "coll": "users",   "filter": {"email": "", "teams.leagueId": "", "teams.teamId": ""}},
+    {"name": "team sync",           "db": USERS,   "coll": "users",   "filter": {"email": "", "teams": {"$elemMatch": {"leagueId": "", "teamId": ""}}}},
+    # tables.py
+    {"name": "team table docs",     "db": FANTASY, "coll": "players",     "filter": {"espn_id": {"$in": [0]}}},
+    {"name": "tables for user",     "db": FANTASY, "coll": "team_tables", "filter": {"email": ""}},
+    {"name": "tables for players",  "db": FANTASY, "coll": "team_tables", "filter": {"espn_ids": {"$in": [0]}}},
+    {"name": "team table upsert",   "db": FANTASY, "coll": "team_tables", "filter": {"email": "", "leagueId": "", "teamId": ""}},
+    # scripts
+    {"name": "load game upsert",    "db": FANTASY, "coll": "player_games", "filter": {"espn_id": 0, "game_id": ""}},
+    {"name": "player games page",   "db": FANTASY, "coll": "player_games", "filter": {"espn_id": 0}, "sort": [("commence_at", -1)]},
+    {"name": "latest games",        "db": FANTASY, "coll": "player_games", "filter": {"espn_id": {"$in": [0]}, "commence_at": {"$ne": None}}},
+    {"name": "game rows",           "db": FANTASY, "coll": "player_games", "filter": {"game_id": ""}},
+    {"name": "game summary",        "db": FANTASY, "coll": "game_summaries", "filter": {"_id": ""}},
+    {"name": "week rows",           "db": FANTASY, "coll": "player_games", "filter": {"season": 0, "week": 0}},
+    {"name": "untagged rows",       "db": FANTASY, "coll": "player_games", "filter": {"season": {"$exists": False}}},
+    {"name": "archived week",       "db": FANTASY, "coll": "player_games_archive", "filter": {"season": 0, "week": 0}},
+    {"name": "archived player",     "db": FANTASY, "coll": "player_games_archive", "filter": {"rows.espn_id": 0}},
+    {"name": "archived weeks",      "db": FANTASY, "coll": "player_games_archive", "filter": {}, "allow_collscan": True},
+    {"name": "generate roster",     "db": FANTASY, "coll": "players", "filter": {"position": {"$in": ["QB", "RB", "WR", "TE"]}},
+     "sort": [("team", 1), ("position", 1), ("espn_id", 1)]},
+    {"name": "roster flag missing", "db": FANTASY, "coll": "players", "filter": {"espn_id": {"$in": [0]}}},
+    {"name": "team info upsert",    "db": FANTASY, "coll": "teams",   "filter": {"season": 0, "team_id": 0}},
+    {"name": "roster hashes",       "db": FANTASY, "coll": "players", "filter": {}, "allow_collscan": True},
+    # batch backfill: "fantasy missing" can't use an index, and it runs once per ingest
+    {"name": "fantasy backfill",    "db": FANTASY, "coll": "player_games",
+     "filter": {"projections": {"$exists": True, "$ne": {}}, "fantasy.espn_ppr": {"$exists": False}}, "allow_collscan": True},
+]
+
+
+def ensure_indexes():
+    for (db_name, coll_name), models in INDEXES.items():
+        names = get_db(db_name)[coll_name].create_indexes(models)
+        print(f"✓ {db_name}.{coll_name}: {', '.join(names)}")
+
+def _stages(plan):
+    """Every stage name in a winning-plan tree."""
+    if not isinstance(plan, dict):
+        return []
+    out = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        out += _stages(plan.get(key))
+    for child in plan.get("inputStages", []):
+        out += _stages(child)
+    return [s for s in out if s]
+
+def explain_shape(shape):
+    cursor = get_db(shape["db"])[shape["coll"]].find(shape["filter"], shape.get("projection"))
+    if shape.get("sort"):
+        cursor = cursor.sort(shape["sort"])
+    plan = cursor.explain()["queryPlanner"]["winningPlan"]
+    return _stages(plan)
+
+def check_query_plans():
+    """Explain every shape; returns the names of shapes that scan unexpectedly."""
+    failures = []
+    for shape in QUERY_SHAPES:
+        stages = explain_shape(shape)
+        scans = "COLLSCAN" in stages
+        if scans and not shape.get("allow_collscan"):
+            failures.append(shape["name"])
+            print(f"✗ {shape['name']}: COLLSCAN on {shape['db']}.{shape['coll']} {shape['filter']}")
+        else:
+            print(f"✓ {shape['name']}: {' ← '.join(stages)}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create indexes and check query plans.")
+    parser.add_argument("--check", action="store_true", help="only explain the query shapes")
+    args = parser.parse_args()
+
+    if not args.check:
+        ensure_indexes()
+    failures = check_query_plans()
+    if failures:
+        print(f"{len(failures)} query shape(s) scan the whole collection: {', '.join(failures)}")
+        sys.exit(1)
@@ -0,0 +1,265 @@
+"""
+Cross-worker cache invalidation.
+
+Every gunicorn worker keeps its own in-process caches (the data version the
+/nfl fragments key on, the team logo map, logged-in users, the search index).
+One background thread per worker follows writes to the collections behind
+them and empties the affected caches, so entries can live until something
+actually changes and a write still shows up everywhere within about a second:
+
+    replica set / Atlas   one change stream over players, teams, users and
+                          meta; events arrive as writes commit, and the resume
+                          token carries the stream across reconnects
+    standalone mongod     no change streams, so the thread polls two version
+                          documents in meta every POLL_SECS: data_version
+                          (bumped by ingest) and invalidation (bumped by
+                          notify() after the app's own writes)
+
+INVALIDATION_MODE=auto (the default) tries the change stream and falls back
+to polling when the server refuses it; INVALIDATION_MODE=poll skips the
+stream (e.g. for test doubles without change streams).
+
+Caches only serve while the bus is live: each (re)connect empties them all
+first, and while the thread is backing off after an error TopicCache.get()
+goes straight to Mongo and data_version() falls back to its short TTL.
+"""
+import os
+import time
+import threading
+from collections import defaultdict
+
+from pymongo.errors import OperationFailure
+
+from db import get_client, get_db
+from metrics import FRAGMENT_LOOKUPS, INVALIDATIONS
+import updates
+
+# ——— CONFIG ———
+INVALIDATION_MODE     = os.getenv("INVALIDATION_MODE", "auto")   # auto | poll
+META_DB               = updates.DB_NAME
+META_COLL             = updates.META_COLL
+INVALIDATION_ID       = "invalidation"
+POLL_SECS             = float(os.getenv("INVALIDATION_POLL_SECS", 0.5))
+AWAIT_MS              = 250       # change stream getMore wait; bounds how long a batch is held
+FLUSH_SECS            = 0.25      # deliver a burst of events at least this often
+MAX_PENDING           = 256       # distinct keys per batch before it collapses to "everything"
+RETRY_SECS            = 1
+LIVE_VERSION_TTL_SECS = 300       # data_version() TTL while the bus delivers bumps
+TOPICS = {
+    ("fantasy_football", "players"): "players",
+    ("fantasy_football", "teams"):   "teams",
+    ("user_data", "users"):          "users",
+    ("fantasy_football", "meta"):    "data",
+}
+# "$changeStream is only supported on replica sets"
+NO_CHANGE_STREAMS = {40573}
+
+
+def change_pipeline():
+    namespaces = [{"db": db, "coll": coll} for db, coll in TOPICS]
+    return [
+        {"$match": {"$or": [{"ns": {"$in": namespaces}}, {"to": {"$in": namespaces}}]}},
+        {"$project": {"operationType": 1, "ns": 1, "to": 1, "documentKey": 1}},
+    ]
+
+def event_topic(change: dict):
+    """(topic, key) for a change event; key is the document _id, or None for the whole topic."""
+    ns = change.get("to") or change.get("ns") or {}
+    topic = TOPICS.get((ns.get("db"), ns.get("coll")))
+    key = (change.get("documentKey") or {}).get("_id")
+    if topic == "data":
+        # other meta docs (including our own invalidation counters) don't matter here
+        return ("data", None) if key == updates.DATA_VERSION_ID else (None, None)
+    return topic, key
+
+
+class InvalidationBus:
+    """One watcher thread per process, calling subscribers with (key) per topic."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(list)   # topic → [fn(key)]
+        self._thread = None
+        self._pid = None
+        self.mode = "poll" if INVALIDATION_MODE == "poll" else None   # "stream" | "poll" once known
+        self.live = False
+
+    def subscribe(self, topics, fn):
+        with self._lock:
+            for topic in topics:
+                self._subscribers[topic].append(fn)
+
+    def start(self):
+        """Start this process's watcher thread (idempotent, and fork-aware)."""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            # a thread inherited across fork() isn't running here
+            self.live = False
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="cache-invalidation", daemon=True)
+            self._thread.start()
+
+    def publish(self, topic, key=None):
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        INVALIDATIONS.labels(topic, self.mode or "none").inc()
+        for fn in subscribers:
+            try:
+                fn(key)
+            except Exception as e:
+                print(f"cache-invalidation subscriber error ({topic}): {e}")
+
+    def publish_all(self):
+        with self._lock:
+            topics = list(self._subscribers)
+        for topic in topics:
+            self.publish(topic)
+
+    def _set_live(self, live: bool):
+        if live:
+            # anything cached before this point may have missed events
+            self.publish_all()
+            updates.set_version_ttl(LIVE_VERSION_TTL_SECS)
+        else:
+            updates.set_version_ttl(None)
+        self.live = live
+
+    def _run(self):
+        token = None
+        while True:
+            try:
+                if self.mode != "poll":
+                    token = self._stream(token)
+                else:
+                    self._poll()
+            except OperationFailure as e:
+                if e.code in NO_CHANGE_STREAMS:
+                    print("cache-invalidation: no change streams on this server, polling meta instead")
+                    self.mode = "poll"
+                    continue
+                print(f"cache-invalidation error: {e}")
+                token = None          # e.g. the resume point fell off the oplog
+            except Exception as e:
+                print(f"cache-invalidation error: {e}")
+            self._set_live(False)
+            time.sleep(RETRY_SECS)
+
+    def _stream(self, token):
+        with get_client().watch(change_pipeline(), resume_after=token, max_await_time_ms=AWAIT_MS) as stream:
+            self.mode = "stream"
+            self._set_live(True)
+            pending, since = set(), None
+            while stream.alive:
+                change = stream.try_next()
+                token = stream.resume_token
+                if change is not None:
+                    topic, key = event_topic(change)
+                    if topic:
+                        pending.add((topic, key))
+                        since = since or time.monotonic()
+                        if len(pending) > MAX_PENDING:
+                            pending = {(t, None) for t, _ in pending}
+                        if time.monotonic() - since < FLUSH_SECS:
+                            continue
+                if pending:
+                    self._deliver(pending)
+                    pending, since = set(), None
+        return token
+
+    def _deliver(self, pending):
+        whole = {t for t, k in pending if k is None}
+        for topic in whole:
+            self.publish(topic)
+        for topic, key in pending:
+            if key is not None and topic not in whole:
+                self.publish(topic, key)
+
+    def _poll(self):
+        meta = get_db(META_DB)[META_COLL]
+        last = None
+        while True:
+            docs = {d["_id"]: d for d in meta.find({"_id": {"$in": [updates.DATA_VERSION_ID, INVALIDATION_ID]}})}
+            counters = docs.get(INVALIDATION_ID, {})
+            current = {"data": docs.get(updates.DATA_VERSION_ID, {}).get("version", 0)}
+            current.update({t: counters.get(t, 0) for t in TOPICS.values() if t != "data"})
+            if last is None:
+                self._set_live(True)
+            else:
+                changed = {t for t, v in current.items() if v != last[t]}
+                if "data" in changed:
+                    # ingest rewrote players/teams; the version bump is all polling sees
+                    changed |= {"players", "teams"}
+                for topic in changed:
+                    self.publish(topic)
+            last = current
+            time.sleep(POLL_SECS)
+
+
+_bus = InvalidationBus()
+
+
+def bus() -> InvalidationBus:
+    return _bus
+
+
+def notify(topic: str):
+    """
+    Record a write to `topic` for workers polling a standalone server. With
+    change streams the write itself is the event, so this is a no-op.
+    """
+    if _bus.mode == "stream":
+        return
+    get_db(META_DB)[META_COLL].update_one({"_id": INVALIDATION_ID}, {"$inc": {topic: 1}}, upsert=True)
+
+
+class TopicCache:
+    """
+    Small process-local cache emptied by bus events on its topics. With
+    keyed=True an event naming one document drops only that entry (keys are
+    str(_id)). A load that races an invalidation is returned but not stored.
+    """
+
+    def __init__(self, name, topics, keyed=False, max_entries=10000):
+        self.name = name
+        self.keyed = keyed
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._items = {}
+        self._generation = 0
+        _bus.subscribe(topics, self.invalidate)
+
+    def get(self, key, loader):
+        if not _bus.live:
+            return loader()
+        with self._lock:
+            if key in self._items:
+                value = self._items[key]
+                FRAGMENT_LOOKUPS.labels(self.name, "hit").inc()
+                return value
+            generation = self._generation
+        FRAGMENT_LOOKUPS.labels(self.name, "miss").inc()
+        value = loader()
+        with self._lock:
+            if generation == self._generation and len(self._items) < self.max_entries:
+                self._items[key] = value
+        return value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            self._generation += 1
+            if key is None or not self.keyed:
+                self._items.clear()
+            else:
+                self._items.pop(str(key), None)
+
+
+def init_app(app):
+    # started on the first request so each forked worker gets its own thread
+    @app.before_request
+    def _start_invalidation():
+        _bus.start()
+
+    _bus.subscribe(["data"], lambda key: updates.expire_data_version())
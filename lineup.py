@@ -0,0 +1,195 @@
+"""
+Start/sit lineup optimizer for saved teams.
+
+Filling lineup slots from a roster is an assignment problem: players × slots,
+where a player may only fill slots their position is eligible for and the
+lineup's total projected points should be as large as possible. It is solved
+exactly with the Hungarian algorithm, which for a 16-player roster and
+7 slots takes microseconds, so every stored team table can be re-optimized
+after each ingest.
+
+Player values come from the rows tables.build_team_table already stores
+(per-scoring fantasy totals and prop projections), so no extra queries run.
+
+    python lineup.py    # recompute the lineup on every stored team table
+"""
+import time
+from pymongo import UpdateOne
+
+DEFAULT_SLOTS = {"QB": 1, "RB": 2, "WR": 2, "TE": 1, "FLEX": 1}
+SLOT_ELIGIBILITY = {
+    "QB":        {"QB"},
+    "RB":        {"RB"},
+    "WR":        {"WR"},
+    "TE":        {"TE"},
+    "FLEX":      {"RB", "WR", "TE"},
+    "SUPERFLEX": {"QB", "RB", "WR", "TE"},
+}
+SCORING_KEYS = ("espn_ppr", "espn_half", "espn_std")
+SLOT_ORDER   = ["QB", "RB", "WR", "TE", "FLEX", "SUPERFLEX"]
+
+# Cost for a player who can't fill a slot; any real lineup beats it
+_INELIGIBLE = 1e6
+# Projections only break ties between equal fantasy totals
+_TIEBREAK = 1e-6
+
+
+def clean_slots(slots):
+    """
+    Validate a lineupSlots payload ({"QB": 1, "RB": 2, ...}); returns the
+    normalized dict, or None if it names an unknown slot or a bad count.
+    """
+    if not isinstance(slots, dict) or not slots:
+        return None
+    out = {}
+    for name, count in slots.items():
+        name = str(name).upper()
+        if name not in SLOT_ELIGIBILITY or isinstance(count, bool):
+            return None
+        try:
+            count = int(count)
+        except (TypeError, ValueError):
+            return None
+        if not 0 <= count <= 10:
+            return None
+        out[name] = count
+    return out if any(out.values()) else None
+
+def expand_slots(slots=None) -> list:
+    slots = slots or DEFAULT_SLOTS
+    out = []
+    for name in SLOT_ORDER + sorted(set(slots) - set(SLOT_ORDER)):
+        if name in SLOT_ELIGIBILITY:
+            out += [name] * int(slots.get(name, 0) or 0)
+    return out
+
+def hungarian(cost) -> list:
+    """
+    Minimum-cost assignment for an n×m cost matrix with n <= m. Returns
+    assign[i] = column chosen for row i. O(n²m), potentials formulation.
+    """
+    n = len(cost)
+    m = len(cost[0]) if n else 0
+    INF = float("inf")
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    p = [0] * (m + 1)      # p[j] = row matched to column j (1-based, 0 = free)
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [INF] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0, delta, j1 = p[j0], INF, 0
+            row = cost[i0 - 1]
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j], way[j] = cur, j0
+                    if minv[j] < delta:
+                        delta, j1 = minv[j], j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    assign = [None] * n
+    for j in range(1, m + 1):
+        if p[j]:
+            assign[p[j] - 1] = j - 1
+    return assign
+
+
+def candidates_from_table(table: dict) -> list:
+    """Players with position and per-scoring values from a stored team table."""
+    out = []
+    for row in (table or {}).get("rows") or []:
+        stats = row.get("stats") or []
+        if len(stats) < 4:
+            continue
+        position = str(stats[2] or "").upper()
+        fantasy  = (stats[3] or {}).get("values", {}) if isinstance(stats[3], dict) else {}
+        proj_sum = sum(float(v or 0) for v in stats[4:] if isinstance(v, (int, float)))
+        out.append({
+            "espn_id":  row.get("espn_id"),
+            "name":     row.get("name"),
+            "position": position,
+            "values":   {k: float(fantasy.get(k, 0) or 0) for k in SCORING_KEYS},
+            "proj_sum": proj_sum,
+        })
+    return out
+
+def optimize(candidates: list, slots=None, scoring: str = "espn_ppr") -> dict:
+    slot_list = expand_slots(slots)
+    if not slot_list:
+        return {"scoring": scoring, "starters": [], "bench": [c["espn_id"] for c in candidates], "total": 0.0}
+
+    # Rows = slots, columns = players (plus one dummy per slot so every slot
+    # can be left empty when no eligible player exists)
+    n_players = len(candidates)
+    cost = []
+    for slot in slot_list:
+        eligible = SLOT_ELIGIBILITY[slot]
+        row = [
+            -(c["values"].get(scoring, 0.0) + _TIEBREAK * c["proj_sum"]) if c["position"] in eligible else _INELIGIBLE
+            for c in candidates
+        ]
+        cost.append(row + [_INELIGIBLE / 2] * len(slot_list))
+    assign = hungarian(cost)
+
+    starters, used = [], set()
+    for i, (slot, j) in enumerate(zip(slot_list, assign)):
+        if j is None or j >= n_players or cost[i][j] >= _INELIGIBLE:
+            starters.append({"slot": slot, "espn_id": None, "name": None, "points": 0.0})
+            continue
+        c = candidates[j]
+        used.add(j)
+        starters.append({
+            "slot":    slot,
+            "espn_id": c["espn_id"],
+            "name":    c["name"],
+            "points":  round(c["values"].get(scoring, 0.0), 2),
+        })
+    return {
+        "scoring":  scoring,
+        "starters": starters,
+        "bench":    [c["espn_id"] for j, c in enumerate(candidates) if j not in used],
+        "total":    round(sum(s["points"] for s in starters), 2),
+    }
+
+def lineups_for_table(table: dict, slots=None) -> dict:
+    """Optimal lineup for every scoring profile, keyed by scoring key."""
+    candidates = candidates_from_table(table)
+    return {k: optimize(candidates, slots, k) for k in SCORING_KEYS}
+
+
+def recompute_all_lineups() -> int:
+    """Re-optimize every stored team table in one pass (one read, one bulk write)."""
+    from tables import team_tables_collection
+
+    coll = team_tables_collection()
+    ops = []
+    for doc in coll.find({}, {"table": 1, "lineupSlots": 1}):
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {
+            "lineup": lineups_for_table(doc.get("table"), doc.get("lineupSlots")),
+        }}))
+    if ops:
+        coll.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    n = recompute_all_lineups()
+    print(f"Optimized {n} team lineups in {(time.perf_counter() - start) * 1000:.1f} ms")
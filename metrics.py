@@ -0,0 +1,248 @@
+"""
+Prometheus metrics for the app and the ingest scripts.
+
+Every Mongo command is attributed to a "scope": the Flask route serving the
+request, or `script:<name>` inside a script run. Per-scope counters give
+query count, time and documents returned, and the per-request histogram of
+query counts is what makes an N+1 (one find per roster row) stand out.
+
+Scripts write their registry to METRICS_TEXTFILE_DIR when a run ends; the
+app's /metrics merges those files in (labelled by source) so one scrape
+covers both. Under gunicorn with several workers, set PROMETHEUS_MULTIPROC_DIR
+so every worker's counters are aggregated instead of whichever one answered.
+"""
+import os
+import sys
+import time
+import glob
+import contextvars
+from contextlib import contextmanager
+from pymongo import monitoring
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, REGISTRY, CONTENT_TYPE_LATEST,
+    generate_latest, write_to_textfile,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.parser import text_string_to_metric_families
+
+# ——— CONFIG ———
+METRICS_TEXTFILE_DIR = os.getenv("METRICS_TEXTFILE_DIR", "data/metrics")
+MULTIPROC_DIR        = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Flask request latency",
+    ["route", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+MONGO_COMMANDS = Counter("mongo_commands", "Mongo commands issued", ["scope", "command", "collection", "outcome"])
+MONGO_SECONDS  = Counter("mongo_command_seconds", "Time spent in Mongo commands", ["scope", "command", "collection"])
+MONGO_DOCS     = Counter("mongo_documents_returned", "Documents returned in cursor batches", ["scope", "collection"])
+MONGO_PER_REQUEST = Histogram(
+    "mongo_commands_per_request", "Mongo commands issued while serving one request",
+    ["route"], buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250),
+)
+SCRIPT_RUNS    = Counter("script_runs", "Script runs", ["script", "status"])
+SCRIPT_SECONDS = Histogram(
+    "script_duration_seconds", "Script run duration", ["script"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800),
+)
+SCRIPT_ROWS    = Counter("script_rows", "Rows written by a script run", ["script"])
+FRAGMENT_LOOKUPS = Counter("fragment_cache_lookups", "In-process cache lookups (fragments, compressed bodies, invalidated caches)", ["cache", "result"])
+INVALIDATIONS    = Counter("cache_invalidations", "Invalidation bus deliveries", ["topic", "mode"])
+
+
+class Scope:
+    """Mongo totals for one request or script run."""
+
+    def __init__(self, name):
+        self.name          = name
+        self.queries       = 0
+        self.mongo_seconds = 0.0
+        self.documents     = 0
+        self.commands      = None   # per-command timings, only while profiling
+
+_scope = contextvars.ContextVar("metrics_scope", default=None)
+
+def current_scope():
+    return _scope.get()
+
+@contextmanager
+def scope(name):
+    token = _scope.set(Scope(name))
+    try:
+        yield _scope.get()
+    finally:
+        _scope.reset(token)
+
+
+def _collection(event):
+    # The command's first value is the collection name for find/insert/update/...
+    value = event.command.get(event.command_name) if hasattr(event, "command") else None
+    return value if isinstance(value, str) else ""
+
+def _batch_size(reply):
+    cursor = reply.get("cursor") if isinstance(reply, dict) else None
+    if not isinstance(cursor, dict):
+        return 0
+    return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Attributes each command to the calling thread's scope. pymongo publishes
+    command events on the thread that issued the command, so the contextvar
+    set by the request (or script) is the one we see here.
+    """
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        self._collections[event.request_id] = _collection(event)
+
+    def _finish(self, event, outcome, reply=None):
+        coll  = self._collections.pop(event.request_id, "")
+        s     = _scope.get()
+        label = s.name if s else "other"
+        secs  = event.duration_micros / 1e6
+        docs  = _batch_size(reply)
+        MONGO_COMMANDS.labels(label, event.command_name, coll, outcome).inc()
+        MONGO_SECONDS.labels(label, event.command_name, coll).inc(secs)
+        if docs:
+            MONGO_DOCS.labels(label, coll).inc(docs)
+        if s:
+            s.queries       += 1
+            s.mongo_seconds += secs
+            s.documents     += docs
+            if s.commands is not None:
+                s.commands.append({"command": event.command_name, "collection": coll,
+                                   "ms": round(secs * 1000, 3), "documents": docs, "outcome": outcome})
+
+    def succeeded(self, event):
+        self._finish(event, "ok", event.reply)
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+command_metrics = CommandMetrics()
+
+
+# ——— Flask ———
+
+def init_app(app):
+    from flask import request, g
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+        g._metrics_token = _scope.set(Scope(request.url_rule.rule if request.url_rule else "unmatched"))
+
+    @app.after_request
+    def _observe(response):
+        start = g.pop("_metrics_start", None)
+        s = _scope.get()
+        if start is not None and s is not None:
+            REQUEST_LATENCY.labels(s.name, request.method, response.status_code).observe(time.perf_counter() - start)
+            MONGO_PER_REQUEST.labels(s.name).observe(s.queries)
+        return response
+
+    @app.teardown_request
+    def _reset_scope(exc):
+        token = g.pop("_metrics_token", None)
+        if token is not None:
+            _scope.reset(token)
+
+
+# ——— scripts ———
+
+class ScriptRun:
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+
+@contextmanager
+def script_run(name):
+    """
+    with script_run("load_data") as run:
+        run.rows = update_players_with_games_from_dir(...)
+    """
+    run = ScriptRun(name)
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        with scope(f"script:{name}"):
+            yield run
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        SCRIPT_RUNS.labels(name, status).inc()
+        SCRIPT_SECONDS.labels(name).observe(time.perf_counter() - start)
+        if run.rows:
+            SCRIPT_ROWS.labels(name).inc(run.rows)
+        write_textfile()
+
+def write_textfile():
+    """Dump this process's registry for /metrics (or node_exporter) to pick up."""
+    if not METRICS_TEXTFILE_DIR:
+        return
+    os.makedirs(METRICS_TEXTFILE_DIR, exist_ok=True)
+    source = os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0]
+    write_to_textfile(os.path.join(METRICS_TEXTFILE_DIR, f"{source}.prom"), REGISTRY)
+
+
+# ——— exposition ———
+
+class PoolCollector:
+    """Connection pool counters from db.pool_stats() as gauges."""
+
+    def collect(self):
+        from db import pool_stats
+        g = GaugeMetricFamily("mongo_pool", "Mongo connection pool counters", labels=["server", "stat"])
+        for server, stats in pool_stats()["servers"].items():
+            for key, value in stats.items():
+                g.add_metric([server, key], value)
+        yield g
+
+
+class ExpositionCollector:
+    """This process's (or every worker's) metrics, merged with the script textfiles."""
+
+    def collect(self):
+        if MULTIPROC_DIR:
+            from prometheus_client import multiprocess
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+
+        families = {}
+        for fam in registry.collect():
+            families[fam.name] = fam
+        for fam in PoolCollector().collect():
+            families[fam.name] = fam
+
+        for path in sorted(glob.glob(os.path.join(METRICS_TEXTFILE_DIR or "", "*.prom"))):
+            source = os.path.splitext(os.path.basename(path))[0]
+            try:
+                with open(path) as f:
+                    parsed = list(text_string_to_metric_families(f.read()))
+            except (OSError, ValueError):
+                continue
+            for fam in parsed:
+                # Skip the textfile's process/python collectors; the app reports its own
+                if fam.name.startswith(("process_", "python_")):
+                    continue
+                samples = [s._replace(labels={**s.labels, "source": source}) for s in fam.samples]
+                if fam.name in families:
+                    families[fam.name].samples.extend(samples)
+                else:
+                    fam.samples = samples
+                    families[fam.name] = fam
+        yield from families.values()
+
+_exposition = CollectorRegistry(auto_describe=False)
+_exposition.register(ExpositionCollector())
+
+def render_latest():
+    return generate_latest(_exposition), CONTENT_TYPE_LATEST
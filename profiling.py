@@ -0,0 +1,176 @@
+"""
+On-demand cProfile captures for single requests and script runs.
+
+A request is profiled only when an admin (email in ADMIN_EMAILS) sends a
+token minted by /api/admin/profile-token, either as `?_profile=<token>` or in
+the X-Profile-Token header. Each capture writes two files to PROFILE_DIR:
+
+    <timestamp>-<name>.prof   cProfile stats (snakeviz, `python -m pstats`)
+    <timestamp>-<name>.json   route, args, status, wall time, Mongo commands
+
+Scripts take a `--profile` flag (or PROFILE=1) and write the same pair.
+cProfile is process-wide from 3.12 on, so only one capture runs at a time;
+a request that arrives while another is being profiled is served normally.
+"""
+import os
+import re
+import sys
+import json
+import time
+import cProfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+
+from metrics import current_scope, scope
+
+# ——— CONFIG ———
+PROFILE_DIR           = os.getenv("PROFILE_DIR", "data/profiles")
+PROFILE_TOKEN_MAX_AGE = int(os.getenv("PROFILE_TOKEN_MAX_AGE", 3600))
+ADMIN_EMAILS          = {e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()}
+TOKEN_PARAM           = "_profile"
+TOKEN_HEADER          = "X-Profile-Token"
+TOKEN_SALT            = "request-profile"
+
+_busy = threading.Lock()
+
+
+def is_admin(email) -> bool:
+    return bool(email) and email.lower() in ADMIN_EMAILS
+
+def _serializer(secret_key):
+    return URLSafeTimedSerializer(secret_key, salt=TOKEN_SALT)
+
+def make_token(secret_key, email) -> str:
+    return _serializer(secret_key).dumps({"email": email.lower()})
+
+def token_email(secret_key, token):
+    try:
+        data = _serializer(secret_key).loads(token, max_age=PROFILE_TOKEN_MAX_AGE)
+    except BadSignature:
+        return None
+    return data.get("email")
+
+
+def _write(name, profiler, meta):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    base = os.path.join(PROFILE_DIR, f"{stamp}-{re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_') or 'root'}")
+    profiler.dump_stats(base + ".prof")
+    with open(base + ".json", "w") as f:
+        json.dump({**meta, "profile": os.path.basename(base + ".prof")}, f, indent=2, default=str)
+    return base + ".prof"
+
+def _mongo_summary(s):
+    if s is None:
+        return {}
+    return {
+        "queries":   s.queries,
+        "seconds":   round(s.mongo_seconds, 6),
+        "documents": s.documents,
+        "commands":  s.commands or [],
+    }
+
+
+# ——— Flask ———
+
+def init_app(app):
+    from flask import request, g
+    from flask_login import current_user
+
+    def requested():
+        token = request.args.get(TOKEN_PARAM) or request.headers.get(TOKEN_HEADER)
+        if not token or not current_user.is_authenticated or not is_admin(current_user.email):
+            return False
+        return token_email(app.secret_key, token) == current_user.email.lower()
+
+    @app.before_request
+    def _start_profile():
+        if not requested() or not _busy.acquire(blocking=False):
+            return
+        s = current_scope()
+        if s is not None:
+            s.commands = []
+        g._profiler = cProfile.Profile()
+        g._profile_start = time.perf_counter()
+        g._profiler.enable()
+
+    @app.after_request
+    def _stop_profile(response):
+        profiler = g.pop("_profiler", None)
+        if profiler is None:
+            return response
+        try:
+            profiler.disable()
+            s = current_scope()
+            path = _write(request.path, profiler, {
+                "route":   request.url_rule.rule if request.url_rule else None,
+                "path":    request.path,
+                "method":  request.method,
+                "args":    {k: v for k, v in request.args.items() if k != TOKEN_PARAM},
+                "view_args": request.view_args,
+                "status":  response.status_code,
+                "seconds": round(time.perf_counter() - g.pop("_profile_start"), 6),
+                "user":    current_user.email,
+                "mongo":   _mongo_summary(s),
+            })
+            response.headers["X-Profile"] = os.path.basename(path)
+        finally:
+            _busy.release()
+        return response
+
+    @app.teardown_request
+    def _release_profile(exc):
+        # after_request is skipped when the view raises
+        profiler = g.pop("_profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            _busy.release()
+
+
+# ——— scripts ———
+
+def profile_requested(argv=None) -> bool:
+    argv = sys.argv if argv is None else argv
+    return "--profile" in argv or os.getenv("PROFILE") == "1"
+
+@contextmanager
+def profiled(name, enabled=None):
+    """
+    with profiled("load_data"):
+        update_players_with_games_from_dir(...)
+
+    A no-op unless enabled (default: `--profile` on the command line).
+    """
+    if enabled is None:
+        enabled = profile_requested()
+    if not enabled or not _busy.acquire(blocking=False):
+        yield
+        return
+
+    s = current_scope()
+    with (scope(f"script:{name}") if s is None else _noop()) as own:
+        s = s or own
+        s.commands = []
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            try:
+                path = _write(name, profiler, {
+                    "script":  name,
+                    "argv":    sys.argv[1:],
+                    "seconds": round(time.perf_counter() - start, 6),
+                    "mongo":   _mongo_summary(s),
+                })
+                print(f"Profile written to {path}")
+            finally:
+                _busy.release()
+
+@contextmanager
+def _noop():
+    yield None
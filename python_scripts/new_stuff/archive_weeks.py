@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Move completed weeks out of player_games into player_games_archive.
+
+Everything older than the hot window (the current week and the one before,
+games.HOT_WEEKS) is compacted into one bucket per (season, week); rows from
+before season/week tagging are tagged first. Safe to re-run.
+
+Run from the repo root:
+    python -m python_scripts.new_stuff.archive_weeks [--hot-weeks 2] [--dry-run]
+"""
+import argparse
+
+from games import HOT_WEEKS, archivable_weeks, archive_weeks, current_season_week, player_games_collection
+
+
+if __name__ == "__main__":
+    from metrics import script_run
+    from profiling import profiled
+
+    parser = argparse.ArgumentParser(description="Archive completed weeks of player_games.")
+    parser.add_argument("--hot-weeks", type=int, default=HOT_WEEKS, help="weeks to keep in player_games")
+    parser.add_argument("--dry-run", action="store_true", help="list the weeks that would be archived")
+    parser.add_argument("--profile", action="store_true", help="write a cProfile capture to data/profiles")
+    args = parser.parse_args()
+
+    season, week = current_season_week()
+    print(f"Current week: {season} week {week}, keeping {args.hot_weeks} hot")
+    if args.dry_run:
+        # read-only: untagged rows would be tagged (and possibly archived) by a real run
+        untagged = player_games_collection().count_documents({"season": {"$exists": False}})
+        print(f"{untagged} untagged rows would be tagged first")
+        for s, w in archivable_weeks(hot_weeks=args.hot_weeks):
+            print(f"  would archive {s} week {w}")
+    else:
+        with script_run("archive_weeks") as run, profiled("archive_weeks", args.profile):
+            moved = archive_weeks(hot_weeks=args.hot_weeks)
+            run.rows = sum(moved.values())
+        for (s, w), n in moved.items():
+            print(f"✓ {s} week {w}: {n} rows archived")
+        print(f"Archived {sum(moved.values())} rows from {len(moved)} weeks")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Measure what a gunicorn worker pays to start: import time and resident memory
+of `import app`, and the heaviest modules on that import path.
+
+Run from the repo root:
+    python -m python_scripts.new_stuff.bench_startup [--runs 5] [--gunicorn]
+
+--gunicorn also boots `gunicorn app:app` with WORKERS workers and reports each
+worker's resident memory once the app answers (Linux only: reads /proc).
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import statistics
+import subprocess
+import urllib.request
+
+# ——— CONFIG ———
+RUNS          = 5
+TOP_IMPORTS   = 15
+WORKERS       = int(os.getenv("BENCH_WORKERS", 2))
+BIND          = os.getenv("BENCH_BIND", "127.0.0.1:18765")
+BOOT_TIMEOUT  = 30
+
+# Runs in a fresh interpreter so nothing is already imported
+PROBE = """
+import json, time, resource, sys
+t = time.perf_counter()
+import app
+secs = time.perf_counter() - t
+print(json.dumps({
+    "seconds":   secs,
+    "maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "modules":   len(sys.modules),
+    "heavy":     sorted(m for m in ("pandas", "numpy", "statsapi", "pyarrow") if m in sys.modules),
+}))
+"""
+
+def probe_import():
+    out = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def top_imports(n=TOP_IMPORTS):
+    """Heaviest modules by cumulative import time, from -X importtime."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                         capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cum_us, name = [p.strip() for p in line.replace("import time:", "").split("|")]
+        rows.append((int(cum_us) / 1000, int(self_us) / 1000, name))
+    return sorted(rows, reverse=True)[:n]
+
+def rss_kb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return None
+
+def child_pids(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+def bench_gunicorn():
+    proc = subprocess.Popen(
+        ["gunicorn", "app:app", "-w", str(WORKERS), "-b", BIND],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    start = time.perf_counter()
+    try:
+        while True:
+            if time.perf_counter() - start > BOOT_TIMEOUT:
+                raise TimeoutError(f"gunicorn did not answer within {BOOT_TIMEOUT}s")
+            try:
+                urllib.request.urlopen(f"http://{BIND}/metrics", timeout=1)
+                break
+            except OSError:
+                time.sleep(0.1)
+        boot = time.perf_counter() - start
+        # Let every worker finish booting, not just the one that answered
+        time.sleep(1)
+        workers = {pid: rss_kb(pid) for pid in child_pids(proc.pid)}
+        return {"boot_seconds": round(boot, 3), "master_rss_kb": rss_kb(proc.pid), "workers_rss_kb": workers}
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark app import time and worker memory.")
+    parser.add_argument("--runs", type=int, default=RUNS)
+    parser.add_argument("--gunicorn", action="store_true", help="also boot gunicorn and measure worker RSS")
+    args = parser.parse_args()
+
+    samples = [probe_import() for _ in range(args.runs)]
+    secs = [s["seconds"] for s in samples]
+    print(f"import app: median {statistics.median(secs) * 1000:.0f} ms "
+          f"(min {min(secs) * 1000:.0f}, max {max(secs) * 1000:.0f}) over {args.runs} runs")
+    print(f"max RSS after import: {statistics.median(s['maxrss_kb'] for s in samples) / 1024:.1f} MiB, "
+          f"{samples[0]['modules']} modules loaded")
+    if samples[0]["heavy"]:
+        print(f"⚠ heavy optional modules on the import path: {', '.join(samples[0]['heavy'])}")
+
+    print(f"\nTop {TOP_IMPORTS} imports by cumulative time (ms):")
+    for cum, own, name in top_imports():
+        print(f"  {cum:8.1f}  {own:7.1f}  {name}")
+
+    if args.gunicorn:
+        g = bench_gunicorn()
+        print(f"\ngunicorn: answered after {g['boot_seconds']}s, master {g['master_rss_kb'] / 1024:.1f} MiB")
+        for pid, kb in g["workers_rss_kb"].items():
+            print(f"  worker {pid}: {kb / 1024:.1f} MiB")
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Columnar (Parquet) snapshots of the odds JSON files.
+
+Each game file in data/nfl or data/mlb is flattened to one row per outcome
+(bookmaker × market × outcome) and written as typed Parquet, partitioned by
+the game's commence date:
+
+    data/columnar/<sport>/date=YYYY-MM-DD/part-0.parquet
+
+Run from the repo root:
+    python -m python_scripts.new_stuff.columnar
+"""
+import os
+import json
+from collections import defaultdict
+
+import pandas as pd
+
+# ——— CONFIG ———
+SOURCE_DIRS  = {"nfl": "data/nfl", "mlb": "data/mlb"}
+COLUMNAR_DIR = os.getenv("COLUMNAR_DIR", "data/columnar")
+
+COLUMNS = {
+    "sport_key":          "string",
+    "game_id":            "string",
+    "commence_time":      "datetime64[ns, UTC]",
+    "home_team":          "string",
+    "away_team":          "string",
+    "bookmaker":          "string",
+    "market":             "string",
+    "market_last_update": "datetime64[ns, UTC]",
+    "side":               "string",   # "over" / "under"
+    "player":             "string",
+    "point":              "float64",
+    "price":              "float64",
+}
+
+def flatten_game(game: dict) -> list[dict]:
+    rows = []
+    base = {
+        "sport_key":     game.get("sport_key"),
+        "game_id":       game.get("id"),
+        "commence_time": game.get("commence_time"),
+        "home_team":     game.get("home_team"),
+        "away_team":     game.get("away_team"),
+    }
+    for book in game.get("bookmakers", []):
+        for market in book.get("markets", []):
+            for outcome in market.get("outcomes", []):
+                rows.append({
+                    **base,
+                    "bookmaker":          book.get("key"),
+                    "market":             market.get("key"),
+                    "market_last_update": market.get("last_update") or book.get("last_update"),
+                    "side":               str(outcome.get("name", "")).lower(),
+                    "player":             outcome.get("description"),
+                    "point":              outcome.get("point"),
+                    "price":              outcome.get("price"),
+                })
+    return rows
+
+def to_frame(rows: list[dict]) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=list(COLUMNS))
+    for col, dtype in COLUMNS.items():
+        if dtype.startswith("datetime"):
+            df[col] = pd.to_datetime(df[col], utc=True, errors="coerce")
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+def export_dir(source_dir: str, sport: str, out_dir: str = COLUMNAR_DIR) -> int:
+    """Flatten every JSON file in source_dir and rewrite its date partitions."""
+    rows = []
+    for fname in sorted(os.listdir(source_dir)):
+        if not fname.lower().endswith(".json"):
+            continue
+        with open(os.path.join(source_dir, fname), "r") as f:
+            game = json.load(f)
+        # the_odds writes [] when a request fails
+        if isinstance(game, dict):
+            rows.extend(flatten_game(game))
+
+    if not rows:
+        return 0
+    return write_partitions(to_frame(rows), sport, out_dir)
+
+def write_partitions(df: pd.DataFrame, sport: str, out_dir: str = COLUMNAR_DIR) -> int:
+    """Write a to_frame() frame as one Parquet file per commence date."""
+    df = df.dropna(subset=["commence_time"])
+    # group on the day itself and format only the keys; strftime per row is slow
+    for day, part in df.groupby(df["commence_time"].dt.normalize()):
+        part_dir = os.path.join(out_dir, sport, f"date={day:%Y-%m-%d}")
+        os.makedirs(part_dir, exist_ok=True)
+        # one file per partition, so re-exports overwrite instead of appending
+        part.to_parquet(os.path.join(part_dir, "part-0.parquet"), engine="pyarrow", index=False)
+    return len(df)
+
+def read_snapshots(sport: str, dates=None, columns=None, base_dir: str = COLUMNAR_DIR) -> pd.DataFrame:
+    """Load the flattened outcomes for a sport, optionally pruned to some dates."""
+    path = os.path.join(base_dir, sport)
+    filters = [("date", "in", list(dates))] if dates else None
+    return pd.read_parquet(path, engine="pyarrow", columns=columns, filters=filters)
+
+def paired_lines(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per (game, bookmaker, market, player) with the over/under price
+    at a single line. When a player has alternate lines the last complete one
+    wins, matching what load_data did when walking the JSON.
+    """
+    keys = ["game_id", "bookmaker", "market", "player"]
+    meta = ["commence_time", "home_team", "away_team"]
+    df = df.dropna(subset=["player", "point", "price"])
+    wide = (
+        df.pivot_table(index=keys + meta + ["point"], columns="side", values="price", aggfunc="last")
+          .reset_index()
+    )
+    for side in ("over", "under"):
+        if side not in wide:
+            wide[side] = float("nan")
+    wide = wide.dropna(subset=["over", "under"])
+    return wide.groupby(keys, as_index=False).last()
+
+def iter_game_sides(sport: str = "nfl", dates=None, bookmaker: str = "draftkings", base_dir: str = COLUMNAR_DIR):
+    """
+    Yield (base_info, sides_by_prop) per game in the shape load_data expects:
+    sides_by_prop[prop_key][player_name] = {"over": .., "under": .., "line": ..}
+    """
+    df = read_snapshots(sport, dates, base_dir=base_dir)
+    df = df[df["bookmaker"] == bookmaker]
+    if df.empty:
+        return
+    wide = paired_lines(df)
+
+    for game_id, g in wide.groupby("game_id"):
+        first = g.iloc[0]
+        base_info = {
+            "game_id":       game_id,
+            "commence_time": first["commence_time"].strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "home_team":     first["home_team"],
+            "away_team":     first["away_team"],
+        }
+        sides_by_prop = defaultdict(dict)
+        for r in g.itertuples(index=False):
+            sides_by_prop[r.market][r.player] = {"over": r.over, "under": r.under, "line": r.point}
+        yield base_info, sides_by_prop
+
+if __name__ == "__main__":
+    for sport, src in SOURCE_DIRS.items():
+        if not os.path.isdir(src):
+            continue
+        n = export_dir(src, sport)
+        print(f"{sport}: wrote {n} outcome rows to {os.path.join(COLUMNAR_DIR, sport)}")
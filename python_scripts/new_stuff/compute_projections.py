@@ -1,12 +1,12 @@
 #!/usr/bin/env python3
-import os
 from datetime import datetime, timezone
-from pymongo import MongoClient
+from pymongo import UpdateOne
+from updates import publish_updates, bump_data_version
+from tables import refresh_tables_for_players
+from games import player_games_collection, refresh_latest_games, refresh_game_summaries
 
 # --- CONFIG ---
-MONGO_URI       = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-DB_NAME         = "fantasy_football"
-COLLECTION_NAME = "players"
+WRITE_BATCH = 1000
 
 SCORING_PROFILES = {
     "espn_ppr": {
@@ -39,61 +39,88 @@ def compute_points(projections: dict, weights: dict) -> float:
 def build_fantasy_from_projections(projections: dict) -> dict:
     return {k: compute_points(projections, w) for k, w in SCORING_PROFILES.items()}
 
+def projections_from_columnar(sport: str = "nfl", dates=None, bookmaker: str = "draftkings"):
+    """
+    Projections and fantasy totals straight from the Parquet snapshots, without
+    touching Mongo. One row per (game_id, player) with a column per prop and
+    per scoring profile.
+    """
+    from python_scripts.new_stuff.columnar import read_snapshots, paired_lines
+
+    df = read_snapshots(sport, dates)
+    df = df[df["bookmaker"] == bookmaker]
+    wide = paired_lines(df)
+
+    # Same no-vig expectation as load_data.compute_ev, on whole columns
+    p_over  = 1.0 / wide["over"]
+    p_under = 1.0 / wide["under"]
+    total   = p_over + p_under
+    wide["ev"] = ((p_over / total) * (wide["point"] + 0.5) + (p_under / total) * (wide["point"] - 0.5)).round(2)
+
+    proj = wide.pivot_table(
+        index=["game_id", "commence_time", "home_team", "away_team", "player"],
+        columns="market", values="ev", aggfunc="last",
+    )
+    for name, weights in SCORING_PROFILES.items():
+        cols = [k for k in weights if k in proj.columns]
+        proj[name] = (proj[cols].fillna(0.0) * [weights[k] for k in cols]).sum(axis=1).round(2)
+    proj.columns.name = None
+    return proj.reset_index()
+
 def backfill():
-    client = MongoClient(MONGO_URI)
-    coll   = client[DB_NAME][COLLECTION_NAME]
+    coll = player_games_collection()
 
     # --- quick diagnostics ---
-    total_docs = coll.count_documents({})
-    distinct_positions = coll.distinct("position")
-    print(f"Total docs: {total_docs}")
-    print(f"Distinct 'position' values: {distinct_positions}")
-
-    # Case-insensitive filter for QB/RB/WR/TE
-    pos_filter = {"position": {"$regex": "^(QB|RB|WR|TE)$", "$options": "i"}}
-    filtered_count = coll.count_documents(pos_filter)
-    if filtered_count == 0:
-        print("No docs matched the position filter. Falling back to scanning all players.")
-        pos_filter = {}  # fallback
-
-    cursor = coll.find(pos_filter, {"_id": 1, "name": 1, "espn_id": 1, "games": 1})
-    scanned_players = 0
+    total_rows = coll.count_documents({})
+    print(f"Total player_games rows: {total_rows}")
+
+    # Rows with projections that are missing any scoring profile
+    pending = {
+        "projections": {"$exists": True, "$ne": {}},
+        "$or": [{f"fantasy.{k}": {"$exists": False}} for k in SCORING_PROFILES],
+    }
+    cursor = coll.find(pending, {"_id": 1, "espn_id": 1, "game_id": 1, "commence_time": 1,
+                                 "projections": 1, "fantasy": 1})
+    scanned_players = set()
     updated_games   = 0
-
-    for doc in cursor:
-        _id   = doc["_id"]
-        games = doc.get("games", [])
-        if not games:
-            scanned_players += 1
-            continue
-
-        to_set = {}
-        for i, g in enumerate(games):
-            if not isinstance(g, dict):
-                continue
-            projections = g.get("projections")
-            if not projections:
-                continue
-
-            fantasy = g.get("fantasy", {}) or {}
-            # if already has all three, skip
-            already = all(k in fantasy for k in SCORING_PROFILES.keys())
-            if already:
-                continue
-
-            new_vals = build_fantasy_from_projections(projections)
-            fantasy.update(new_vals)
-            to_set[f"games.{i}.fantasy"] = fantasy
-            to_set[f"games.{i}.fantasy_updated_at"] = datetime.now(timezone.utc).isoformat()
-            updated_games += 1
-
-        if to_set:
-            coll.update_one({"_id": _id}, {"$set": to_set})
-
-        scanned_players += 1
-
-    print(f"Players scanned: {scanned_players}")
+    deltas          = []
+    ops             = []
+
+    for g in cursor:
+        scanned_players.add(g.get("espn_id"))
+        fantasy = g.get("fantasy", {}) or {}
+        fantasy.update(build_fantasy_from_projections(g["projections"]))
+        ops.append(UpdateOne({"_id": g["_id"]}, {"$set": {
+            "fantasy":            fantasy,
+            "fantasy_updated_at": datetime.now(timezone.utc).isoformat(),
+        }}))
+        updated_games += 1
+        deltas.append({
+            "espn_id":       g.get("espn_id"),
+            "game_id":       g.get("game_id"),
+            "commence_time": g.get("commence_time"),
+            "fantasy":       fantasy,
+        })
+        if len(ops) >= WRITE_BATCH:
+            coll.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        coll.bulk_write(ops, ordered=False)
+
+    touched = {d["espn_id"] for d in deltas if d.get("espn_id") is not None}
+    publish_updates(deltas)
+    refresh_latest_games(touched)
+    refresh_game_summaries({d["game_id"] for d in deltas})
+    refresh_tables_for_players(touched)
+    if deltas:
+        bump_data_version("compute_projections")
+
+    print(f"Players scanned: {len(scanned_players)}")
     print(f"Games updated with fantasy totals: {updated_games}")
+    return updated_games
 
 if __name__ == "__main__":
-    backfill()
+    from metrics import script_run
+    from profiling import profiled
+    with script_run("compute_projections") as run, profiled("compute_projections"):
+        run.rows = backfill()
@@ -1,16 +1,53 @@
 #!/usr/bin/env python3
+"""
+Synthetic NFL odds slates for load and regression testing.
+
+Everything is driven by one seed: the same seed, roster and start date always
+produce byte-identical games. The roster comes from a JSON fixture
+(a list of {espn_id, name, team, position}) or from one preload query on
+players, and never from per-prop lookups.
+
+Each player gets a stable per-prop mean, so lines drift realistically week to
+week. Prices come from that mean (normal for yardage, Poisson for counts) plus
+a per-book margin, and alternate lines go in "<prop>_alternate" markets as the
+odds feed sends them.
+
+Run from the repo root:
+    python -m python_scripts.new_stuff.generate_data                       # one week → data/nfl
+    python -m python_scripts.new_stuff.generate_data --weeks 36 --books 3 --alt-lines 2 --emit parquet
+    python -m python_scripts.new_stuff.generate_data --roster synthetic --emit mongo --weeks 18
+    python -m python_scripts.new_stuff.generate_data --save-roster tests/roster.json
+"""
 import os
-import random
-import uuid
+import math
 import json
+import uuid
+import time
+import random
+import argparse
 from datetime import datetime, timedelta, timezone
-from pymongo import MongoClient
 
 # ——— CONFIG ———
-MONGO_URI         = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 DB_NAME           = "fantasy_football"
 COLLECTION_NAME   = "players"
 OUTPUT_DIR        = "data/nfl"   # ensure this exists
+SEED              = int(os.getenv("GENERATE_SEED", 7))
+ROSTER_FIXTURE    = os.getenv("ROSTER_FIXTURE")   # path, "synthetic", or unset for one Mongo query
+WRITE_BATCH       = 1000
+
+TEAMS = [
+    "ARI","ATL","BAL","BUF","CAR","CHI","CIN","CLE",
+    "DAL","DEN","DET","GB","HOU","IND","JAX","KC",
+    "LV","LAC","LAR","MIA","MIN","NE","NO","NYG",
+    "NYJ","PHI","PIT","SEA","SF","TB","TEN","WSH"
+]
+BOOKMAKERS = [
+    ("draftkings", "DraftKings", 0.045),
+    ("fanduel",    "FanDuel",    0.050),
+    ("betmgm",     "BetMGM",     0.060),
+    ("caesars",    "Caesars",    0.055),
+    ("pointsbet",  "PointsBet",  0.050),
+]
 
 # Map each prop to the positions it applies to
 positions_by_prop = {
@@ -22,92 +59,327 @@ positions_by_prop = {
     "player_reception_yds":["RB", "WR", "TE"],
     "player_reception_tds":["RB", "WR", "TE"],
 }
+COUNT_PROPS = {"player_pass_tds", "player_rush_tds", "player_receptions", "player_reception_tds"}
+
+# Players per team and position that get props, in roster order
+DEPTH = {"QB": 1, "RB": 2, "WR": 4, "TE": 2}
+DEPTH_SCALE = [1.0, 0.6, 0.45, 0.3]
+
+# (low, high) weekly mean for a starter, by position and prop
+MEAN_RANGES = {
+    ("QB", "player_pass_yds"):      (195, 290),
+    ("QB", "player_pass_tds"):      (1.1, 2.2),
+    ("QB", "player_rush_yds"):      (5, 40),
+    ("QB", "player_rush_tds"):      (0.05, 0.4),
+    ("RB", "player_rush_yds"):      (40, 95),
+    ("RB", "player_rush_tds"):      (0.3, 0.8),
+    ("RB", "player_receptions"):    (1.5, 5.0),
+    ("RB", "player_reception_yds"): (10, 40),
+    ("RB", "player_reception_tds"): (0.05, 0.25),
+    ("WR", "player_receptions"):    (4.0, 7.5),
+    ("WR", "player_reception_yds"): (50, 95),
+    ("WR", "player_reception_tds"): (0.3, 0.7),
+    ("TE", "player_receptions"):    (2.5, 6.0),
+    ("TE", "player_reception_yds"): (25, 65),
+    ("TE", "player_reception_tds"): (0.2, 0.5),
+}
+YARDS_CV = 0.35
+ALT_STEP = {"yds": 10.0, "count": 1.0}
+
+# Kickoff slots in minutes after the week's Thursday 00:00 UTC
+# (TNF, eight 1pm ET, 4:05, three 4:25, SNF, two MNF)
+KICKOFFS = [1455] + [5340] * 8 + [5525] + [5545] * 3 + [5780, 7215, 7215]
 
-def random_commence_time():
-    base = datetime.now(timezone.utc) + timedelta(days=1)
-    delta = timedelta(
-        days=random.randint(0, 6),
-        hours=random.randint(0, 23),
-        minutes=random.choice([0, 15, 30, 45])
-    )
-    return (base + delta).strftime("%Y-%m-%dT%H:%M:%SZ")
-
-def generate_fake_nfl_slate(num_games=16):
-    client = MongoClient(MONGO_URI)
-    players = client[DB_NAME][COLLECTION_NAME]
-
-    # Prepare 16 random matchups
-    teams = [
-        "ARI","ATL","BAL","BUF","CAR","CHI","CIN","CLE",
-        "DAL","DEN","DET","GB","HOU","IND","JAX","KC",
-        "LV","LAC","LAR","MIA","MIN","NE","NO","NYG",
-        "NYJ","PHI","PIT","SEA","SF","TB","TEN","WSH"
-    ]
-    random.shuffle(teams)
-    slate = []
-    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-
-    for _ in range(num_games):
-        away = teams.pop()
-        home = teams.pop()
-        markets = []
-
-        for prop, allowed_positions in positions_by_prop.items():
-            outcomes = []
-            # fetch only players of the right position AND on home/away team
-            pool = []
-            for pos in allowed_positions:
-                docs = players.find({
-                    "position": pos,
-                    "team": {"$in": [home, away]}
-                }, {"name":1})
-                pool.extend(d["name"] for d in docs)
-            if not pool:
+
+# ——— roster ———
+
+def load_roster(fixture=ROSTER_FIXTURE, seed=SEED) -> list:
+    """Skill players as [{espn_id, name, team, position}] from a fixture or one query."""
+    if fixture == "synthetic":
+        return synthetic_roster(seed)
+    if fixture:
+        with open(fixture, "r") as f:
+            return json.load(f)
+
+    from db import get_db
+    players = get_db(DB_NAME)[COLLECTION_NAME]
+    cursor = players.find(
+        {"position": {"$in": list(DEPTH)}},
+        {"_id": 0, "espn_id": 1, "name": 1, "team": 1, "position": 1},
+    ).sort([("team", 1), ("position", 1), ("espn_id", 1)])
+    return list(cursor)
+
+def synthetic_roster(seed=SEED) -> list:
+    """A made-up but complete roster, for runs with no database at all."""
+    out = []
+    for team in TEAMS:
+        for position, n in DEPTH.items():
+            for i in range(n + 1):
+                out.append({
+                    "espn_id":  900000 + len(out),
+                    "name":     f"{team} {position}{i + 1}",
+                    "team":     team,
+                    "position": position,
+                })
+    return out
+
+def depth_charts(roster: list) -> dict:
+    """team → [(player, prop, mean)] for the players that get props."""
+    by_team = {}
+    seen = {}
+    for p in roster:
+        pos, team = p.get("position"), p.get("team")
+        if pos not in DEPTH or not team or not p.get("name"):
+            continue
+        rank = seen.get((team, pos), 0)
+        if rank >= DEPTH[pos]:
+            continue
+        seen[(team, pos)] = rank + 1
+        for prop, allowed in positions_by_prop.items():
+            if pos not in allowed or (pos, prop) not in MEAN_RANGES:
                 continue
+            lo, hi = MEAN_RANGES[(pos, prop)]
+            # stable per player and prop, independent of roster order
+            r = random.Random(f"{p.get('espn_id') or p['name']}:{prop}")
+            mean = r.uniform(lo, hi) * DEPTH_SCALE[min(rank, len(DEPTH_SCALE) - 1)]
+            by_team.setdefault(team, []).append((p, prop, mean))
+    return by_team
 
-            for player in pool:
-                # generate a line
-                line = round(
-                    random.uniform(200, 350) if "yds" in prop else random.uniform(0.5, 3.5),
-                    1
-                )
-                price_over  = round(random.uniform(1.5, 3.0), 2)
-                price_under = round(random.uniform(1.5, 3.0), 2)
-                outcomes.extend([
-                    {"name":"Over",  "description":player, "point":line, "price":price_over},
-                    {"name":"Under", "description":player, "point":line, "price":price_under},
-                ])
-
-            markets.append({
-                "key":         prop,
-                "last_update": now,
-                "outcomes":    outcomes
-            })
 
-        slate.append({
-            "id":            str(uuid.uuid4()),
-            "sport_key":     "americanfootball_nfl",
-            "sport_nice":    "NFL",
-            "commence_time": random_commence_time(),
-            "home_team":     home,
-            "away_team":     away,
-            "bookmakers": [
-                {
-                    "key":         "draftkings",
-                    "title":       "DraftKings",
-                    "last_update": now,
-                    "markets":     markets
-                }
+# ——— prices ———
+
+def p_over(prop: str, mean: float, line: float) -> float:
+    if prop in COUNT_PROPS:
+        k = int(math.floor(line))
+        term = cdf = math.exp(-mean)
+        for i in range(1, k + 1):
+            term *= mean / i
+            cdf += term
+        p = 1.0 - cdf
+    else:
+        sigma = max(YARDS_CV * mean, 5.0)
+        p = 0.5 * math.erfc((line - mean) / (sigma * math.sqrt(2)))
+    return min(max(p, 0.03), 0.97)
+
+def prices(p: float, margin: float):
+    """Decimal over/under prices for a fair over probability plus the book's margin."""
+    return round(1.0 / (p * (1 + margin)), 2), round(1.0 / ((1 - p) * (1 + margin)), 2)
+
+def main_line(mean: float) -> float:
+    """Half-point line just under the mean, so the over is slightly favoured like real books."""
+    return math.floor(mean) + 0.5
+
+
+# ——— games ———
+
+def week_start(start=None) -> datetime:
+    """The Thursday on or after start (default: today, UTC) at 00:00 UTC."""
+    day = (start or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    day = day.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day + timedelta(days=(3 - day.weekday()) % 7)
+
+def generate_slates(weeks=1, books=1, alt_lines=0, seed=SEED, roster=None, start=None, num_games=16):
+    """
+    Yield (week, games) with games in the odds-feed JSON shape. Pure: no I/O
+    beyond the roster preload when roster is None.
+    """
+    charts = depth_charts(roster if roster is not None else load_roster(seed=seed))
+    rnd = random.Random(seed)
+    first = week_start(start)
+    books = BOOKMAKERS[:max(1, min(books, len(BOOKMAKERS)))]
+    num_games = min(num_games, len(TEAMS) // 2)
+
+    for week in range(weeks):
+        teams = TEAMS[:]
+        rnd.shuffle(teams)
+        kickoff0 = first + timedelta(weeks=week)
+        games = []
+        for g in range(num_games):
+            away, home = teams[2 * g], teams[2 * g + 1]
+            commence = kickoff0 + timedelta(minutes=KICKOFFS[g % len(KICKOFFS)])
+            stamp = (commence - timedelta(hours=2)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+            # this week's true mean per player prop, shared by every book
+            week_props = [
+                (p, prop, max(mean * rnd.gauss(1.0, 0.12), 0.05))
+                for team in (home, away) for p, prop, mean in charts.get(team, [])
             ]
-        })
 
-    return slate
+            bookmakers = []
+            for key, title, margin in books:
+                main, alt = {}, {}
+                for p, prop, mean in week_props:
+                    is_count = prop in COUNT_PROPS
+                    # books disagree a little on the line and price
+                    shift = 0.0 if is_count else rnd.choice((-1.0, -0.5, 0.0, 0.0, 0.5, 1.0))
+                    line = main_line(mean) + shift
+                    over, under = prices(p_over(prop, mean, line), margin + rnd.uniform(-0.01, 0.01))
+                    main.setdefault(prop, []).extend([
+                        {"name": "Over",  "description": p["name"], "point": line, "price": over},
+                        {"name": "Under", "description": p["name"], "point": line, "price": under},
+                    ])
+                    step = ALT_STEP["count" if is_count else "yds"]
+                    for k in range(1, alt_lines + 1):
+                        for alt_line in (line - k * step, line + k * step):
+                            if alt_line <= 0:
+                                continue
+                            over, under = prices(p_over(prop, mean, alt_line), margin)
+                            alt.setdefault(f"{prop}_alternate", []).extend([
+                                {"name": "Over",  "description": p["name"], "point": alt_line, "price": over},
+                                {"name": "Under", "description": p["name"], "point": alt_line, "price": under},
+                            ])
+                markets = [
+                    {"key": m, "last_update": stamp, "outcomes": outcomes}
+                    for m, outcomes in list(main.items()) + list(alt.items())
+                ]
+                bookmakers.append({"key": key, "title": title, "last_update": stamp, "markets": markets})
 
-if __name__ == "__main__":
-    fake_slate = generate_fake_nfl_slate()
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    for idx, game in enumerate(fake_slate):
-        path = os.path.join(OUTPUT_DIR, f"data{idx}.json")
+            games.append({
+                "id":            uuid.UUID(int=rnd.getrandbits(128), version=4).hex,
+                "sport_key":     "americanfootball_nfl",
+                "sport_nice":    "NFL",
+                "commence_time": commence.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "home_team":     home,
+                "away_team":     away,
+                "bookmakers":    bookmakers,
+            })
+        yield week, games
+
+def generate_fake_nfl_slate(num_games=16, seed=SEED, roster=None):
+    """One week of DraftKings-only games, as the pipeline's generate stage writes."""
+    return next(generate_slates(weeks=1, books=1, seed=seed, roster=roster, num_games=num_games))[1]
+
+
+# ——— sinks ———
+
+def write_slate(slate, out_dir=OUTPUT_DIR, offset=0, indent=2):
+    os.makedirs(out_dir, exist_ok=True)
+    for idx, game in enumerate(slate, start=offset):
+        path = os.path.join(out_dir, f"data{idx}.json")
         with open(path, "w") as f:
-            json.dump(game, f, indent=2)
-    print(f"Generated {len(fake_slate)} games in '{OUTPUT_DIR}'")
+            json.dump(game, f, indent=indent)
+    return len(slate)
+
+def write_parquet(slate, sport="nfl", out_dir=None) -> int:
+    from python_scripts.new_stuff.columnar import COLUMNAR_DIR, flatten_game, to_frame, write_partitions
+
+    rows = [r for game in slate for r in flatten_game(game)]
+    return write_partitions(to_frame(rows), sport, out_dir or COLUMNAR_DIR) if rows else 0
+
+class MongoSink:
+    """
+    Writes each game's DraftKings main-line projections and fantasy totals
+    straight into player_games, skipping the JSON round trip and name lookups.
+    """
+    def __init__(self, roster: list, bookmaker="draftkings"):
+        from games import player_games_collection
+        self.coll      = player_games_collection()
+        self.bookmaker = bookmaker
+        self.ids       = {}
+        for p in roster:
+            self.ids.setdefault((p.get("team"), p.get("name")), p.get("espn_id"))
+        self.touched   = set()
+        self.game_ids  = set()
+        self.ops       = []
+
+    def write(self, slate) -> int:
+        from games import upsert_game_op
+        from python_scripts.new_stuff.load_data import compute_ev, sides_from_game
+        from python_scripts.new_stuff.compute_projections import build_fantasy_from_projections
+
+        stamp = datetime.now(timezone.utc).isoformat()
+        n = 0
+        for game in slate:
+            teams = (game["home_team"], game["away_team"])
+            props_by_id = {}
+            for prop, sides in sides_from_game(game, self.bookmaker).items():
+                if prop not in positions_by_prop:   # alternate-line markets
+                    continue
+                for name, sd in sides.items():
+                    espn_id = self.ids.get((teams[0], name)) or self.ids.get((teams[1], name))
+                    if espn_id and sd["over"] and sd["under"]:
+                        props_by_id.setdefault(espn_id, {})[prop] = compute_ev(sd["line"], sd["over"], sd["under"])
+            for espn_id, props in props_by_id.items():
+                self.ops.append(upsert_game_op(espn_id, {
+                    "game_id":            game["id"],
+                    "commence_time":      game["commence_time"],
+                    "home_team":          teams[0],
+                    "away_team":          teams[1],
+                    "projections":        props,
+                    "fantasy":            build_fantasy_from_projections(props),
+                    "fantasy_updated_at": stamp,
+                }))
+                self.touched.add(espn_id)
+                n += 1
+            self.game_ids.add(game["id"])
+            if len(self.ops) >= WRITE_BATCH:
+                self.flush()
+        return n
+
+    def flush(self):
+        if self.ops:
+            self.coll.bulk_write(self.ops, ordered=False)
+            self.ops = []
+
+    def close(self):
+        from games import refresh_latest_games, refresh_game_summaries
+        from tables import refresh_tables_for_players
+        from updates import bump_data_version
+
+        self.flush()
+        refresh_latest_games(self.touched)
+        refresh_game_summaries(self.game_ids)
+        refresh_tables_for_players(self.touched)
+        if self.touched:
+            bump_data_version("generate_data")
+
+
+def generate(weeks=1, books=1, alt_lines=0, seed=SEED, emit="json", out_dir=None, roster=None,
+             start=None, num_games=16) -> int:
+    """Generate and emit in one pass, one week in memory at a time. Returns rows written."""
+    roster = roster if roster is not None else load_roster(seed=seed)
+    sink = MongoSink(roster) if emit == "mongo" else None
+    total, n_games = 0, 0
+    for _, games in generate_slates(weeks, books, alt_lines, seed, roster, start, num_games):
+        if emit == "json":
+            # compact when bulk generating; the default one-week slate stays readable
+            total += write_slate(games, out_dir or OUTPUT_DIR, offset=n_games, indent=2 if weeks == 1 else None)
+        elif emit == "parquet":
+            total += write_parquet(games, "nfl", out_dir)
+        elif emit == "mongo":
+            total += sink.write(games)
+        else:
+            raise ValueError(f"unknown emit target: {emit}")
+        n_games += len(games)
+    if sink:
+        sink.close()
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic NFL odds slates.")
+    parser.add_argument("--weeks", type=int, default=1)
+    parser.add_argument("--books", type=int, default=1, help=f"bookmakers per game (max {len(BOOKMAKERS)})")
+    parser.add_argument("--alt-lines", type=int, default=0, help="alternate lines each side of the main line")
+    parser.add_argument("--games", type=int, default=16, help="games per week")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--start", help="first week's date (YYYY-MM-DD); default this week")
+    parser.add_argument("--roster", default=ROSTER_FIXTURE, help='fixture path, "synthetic", or omit to query players once')
+    parser.add_argument("--emit", choices=("json", "parquet", "mongo"), default="json")
+    parser.add_argument("--out", help="output directory for json/parquet")
+    parser.add_argument("--save-roster", metavar="PATH", help="write the roster fixture and exit")
+    args = parser.parse_args()
+
+    roster = load_roster(args.roster, args.seed)
+    if args.save_roster:
+        with open(args.save_roster, "w") as f:
+            json.dump(roster, f, indent=1)
+        print(f"Wrote {len(roster)} players to {args.save_roster}")
+        raise SystemExit(0)
+
+    start = datetime.fromisoformat(args.start).replace(tzinfo=timezone.utc) if args.start else None
+    t0 = time.perf_counter()
+    n = generate(args.weeks, args.books, args.alt_lines, args.seed, args.emit, args.out, roster, start, args.games)
+    unit = {"json": "games", "parquet": "outcome rows", "mongo": "player_games rows"}[args.emit]
+    print(f"Generated {n} {unit} ({args.weeks} weeks × {args.books} books) via {args.emit} "
+          f"in {time.perf_counter() - t0:.2f}s")
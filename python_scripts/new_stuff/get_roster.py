@@ -1,8 +1,18 @@
 #!/usr/bin/env python3
 import os
 import json
+import argparse
+import hashlib
 import requests
-from pymongo import MongoClient, UpdateOne
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from pymongo import UpdateOne
+from db import get_db, replace_collection
+from games import refresh_latest_games
+from tables import refresh_tables_for_players
+from indexes import INDEXES
+from updates import bump_data_version
 
 # ——— CONFIG ———
 SEASON            = int(os.getenv("SEASON", 2025))
@@ -14,10 +24,14 @@ ESPN_TEAM_URL     = (
     "http://sports.core.api.espn.com/v2/sports/football/"
     "leagues/nfl/seasons/{season}/teams/{team_id}?lang=en&region=us"
 )
-MONGO_URI         = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 DB_NAME           = "fantasy_football"
 COLLECTION_NAME   = "players"
 TEAMS_COLL_NAME = "teams"
+TEAM_FETCH_WORKERS = int(os.getenv("TEAM_FETCH_WORKERS", 8))
+PLAYER_PAGE_SIZE     = int(os.getenv("PLAYER_PAGE_SIZE", 500))
+PLAYER_FETCH_WORKERS = int(os.getenv("PLAYER_FETCH_WORKERS", 4))
+# Total active players matching the filter, as reported by ESPN
+PLAYER_COUNT_HEADER  = "X-Fantasy-Filter-Player-Count"
 
 # ESPN position ID → fantasy position
 POSITION_MAP = {
@@ -26,112 +40,292 @@ POSITION_MAP = {
     8: "LB", 9: "DB", 10: "LS"
 }
 
+# Fields covered by content_hash; a player is only rewritten when one changes
+HASHED_FIELDS = ("name", "position", "team", "headshot_url")
+
 # Only valid NFL team IDs (1–32)
 VALID_TEAM_IDS = set(range(1, 35))
 VALID_TEAM_IDS.remove(31)
 VALID_TEAM_IDS.remove(32)
 
-def fetch_espn_players(season: int):
+def fetch_player_page(session: requests.Session, season: int, offset: int, limit: int = PLAYER_PAGE_SIZE):
     url = ESPN_PLAYERS_URL.format(season=season)
     params = {"view": "players_wl", "scoringPeriodId": 0}
     headers = {
         "X-Fantasy-Filter": json.dumps({
             "filterActive": {"value": True},
-            "players":      {"limit": 2000}
+            "players":      {"limit": limit, "offset": offset}
         }),
         "User-Agent": "Mozilla/5.0"
     }
-    resp = requests.get(url, params=params, headers=headers)
+    resp = session.get(url, params=params, headers=headers, timeout=30)
     resp.raise_for_status()
-    return resp.json()
+    total = resp.headers.get(PLAYER_COUNT_HEADER)
+    return resp.json(), (int(total) if total and total.isdigit() else None)
+
+def iter_espn_player_pages(season: int, meta: dict):
+    """
+    Yield pages of ESPN player records as they arrive. The first page tells us
+    the total (when ESPN reports it) so every remaining offset is requested at
+    once; otherwise pages are requested a window at a time until one comes
+    back short. meta["total"] / meta["received"] are filled in for the caller.
+    """
+    with make_session(PLAYER_FETCH_WORKERS) as session, \
+         ThreadPoolExecutor(max_workers=PLAYER_FETCH_WORKERS) as pool:
+        first, total = fetch_player_page(session, season, 0)
+        meta["total"], meta["received"] = total, len(first)
+        yield first
+        if len(first) < PLAYER_PAGE_SIZE:
+            return
+
+        if total is not None:
+            futures = [
+                pool.submit(fetch_player_page, session, season, off)
+                for off in range(PLAYER_PAGE_SIZE, total, PLAYER_PAGE_SIZE)
+            ]
+            for fut in as_completed(futures):
+                page, _ = fut.result()
+                meta["received"] += len(page)
+                yield page
+            return
+
+        offset = PLAYER_PAGE_SIZE
+        while True:
+            window = [offset + i * PLAYER_PAGE_SIZE for i in range(PLAYER_FETCH_WORKERS)]
+            offset = window[-1] + PLAYER_PAGE_SIZE
+            futures = [pool.submit(fetch_player_page, session, season, off) for off in window]
+            short = False
+            for fut in as_completed(futures):
+                page, _ = fut.result()
+                meta["received"] += len(page)
+                short = short or len(page) < PLAYER_PAGE_SIZE
+                yield page
+            if short:
+                return
+
+def fetch_espn_players(season: int):
+    return [p for page in iter_espn_player_pages(season, {}) for p in page]
+
+def make_session(pool_size: int = TEAM_FETCH_WORKERS) -> requests.Session:
+    # One keep-alive pool sized to the worker count, shared by every request
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def fetch_one_team(session: requests.Session, season: int, tid: int) -> dict:
+    try:
+        resp = session.get(ESPN_TEAM_URL.format(season=season, team_id=tid), timeout=10)
+    except requests.RequestException:
+        return {"abbrev": "UNK", "logo": None}
+    if not resp.ok:
+        return {"abbrev": "UNK", "logo": None}
+
+    data = resp.json()
+    abbrev = data.get("abbreviation", "UNK")
+    logo = next(
+        (logo_item.get("href")
+         for logo_item in data.get("logos", [])
+         if "primary_logo_on_primary_color" in logo_item.get("rel", [])),
+        None
+    )
+    return {"abbrev": abbrev, "logo": logo}
+
+def fetch_team_info(season: int, team_ids: set, db=None):
+    """
+    Fetch team abbrevs & logos concurrently, then store them with one
+    bulk_write. Pass the caller's db so the sync shares a single client.
+    """
+    with make_session() as session, ThreadPoolExecutor(max_workers=TEAM_FETCH_WORKERS) as pool:
+        futures = {tid: pool.submit(fetch_one_team, session, season, tid) for tid in team_ids}
+        info = {tid: fut.result() for tid, fut in futures.items()}
+
+    if db is None:
+        db = get_db(DB_NAME)
+    teams_coll = db[TEAMS_COLL_NAME]
+    teams_coll.create_index([("season", 1), ("team_id", 1)], unique=True)
+    ops = [
+        UpdateOne({"season": season, "team_id": tid}, {"$set": tinfo}, upsert=True)
+        for tid, tinfo in info.items()
+    ]
+    if ops:
+        teams_coll.bulk_write(ops, ordered=False)
 
-def fetch_team_info(season: int, team_ids: set):
-    info = {}
-    for tid in team_ids:
-        resp = requests.get(
-            ESPN_TEAM_URL.format(season=season, team_id=tid)
-        )
-        if resp.ok:
-            data = resp.json()
-            abbrev = data.get("abbreviation", "UNK")
-            logo = next(
-                (logo_item.get("href")
-                 for logo_item in data.get("logos", [])
-                 if "primary_logo_on_primary_color" in logo_item.get("rel", [])),
-                None
-            )
-            info[tid] = {"abbrev": abbrev, "logo": logo}
-        else:
-            info[tid] = {"abbrev": "UNK", "logo": None}
-            
-        client = MongoClient(MONGO_URI)    
-        teams_coll = client[DB_NAME][TEAMS_COLL_NAME]
-        teams_coll.create_index([("season", 1), ("team_id", 1)], unique=True)
-        ops: list[UpdateOne] = []
-        ops.append(UpdateOne(
-                {"season": season, "team_id": tid},
-                {"$set": info[tid]},
-                upsert=True
-            ))
-        if ops:
-            teams_coll.bulk_write(ops)
-            
     return info
 
+def player_fields(p: dict, team_info: dict):
+    """The roster fields we store for one ESPN player, or None to skip it."""
+    espn_id = p.get("id")
+    if espn_id is None:
+        return None
+    tid = p.get("team", {}).get("id") or p.get("proTeamId")
+    if not isinstance(tid, int) or tid == 0:
+        return None
+
+    tinfo    = team_info.get(tid, {"abbrev": "UNK", "logo": None})
+    headshot = p.get("player", {}).get("headshot", {}).get("url")
+    return {
+        "name":         p.get("fullName") or p.get("player", {}).get("fullName", ""),
+        "position":     POSITION_MAP.get(p.get("defaultPositionId", 0), "UNK"),
+        "team":         tinfo["abbrev"],
+        "headshot_url": headshot or f"https://a.espncdn.com/i/headshots/nfl/players/full/{espn_id}.png",
+    }
+
+def content_hash(fields: dict) -> str:
+    payload = json.dumps({k: fields.get(k) for k in HASHED_FIELDS}, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
 def sync_players_to_mongo(season: int = SEASON):
-    raw_players = fetch_espn_players(season)
+    db     = get_db(DB_NAME)
+    coll   = db[COLLECTION_NAME]
 
-    # Extract and filter valid team IDs only once
-    team_ids = {
-        (p.get("team", {}).get("id") or p.get("proTeamId"))
-        for p in raw_players
+    # Team abbrevs & logos first, so player pages can be written as they land
+    team_info = fetch_team_info(season, VALID_TEAM_IDS, db)
+
+    # Stored hashes for every player we know about, so unchanged ones cost nothing
+    existing = {
+        d["espn_id"]: d
+        for d in coll.find({}, {"_id": 0, "espn_id": 1, "content_hash": 1, "eligible": 1})
     }
-    team_ids = {tid for tid in team_ids
-                if isinstance(tid, int) and tid in VALID_TEAM_IDS}
 
-    # Fetch team abbrevs & logos once
-    team_info = fetch_team_info(season, team_ids)
+    seen  = set()
+    stats = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+    meta  = {}
 
-    client = MongoClient(MONGO_URI)
-    coll   = client[DB_NAME][COLLECTION_NAME]
-    ops    = []
+    for page in iter_espn_player_pages(season, meta):
+        ops = []
+        for p in page:
+            fields = player_fields(p, team_info)
+            if fields is None or p["id"] in seen:
+                continue
+            espn_id = p["id"]
+            seen.add(espn_id)
 
-    for p in raw_players:
-        espn_id = p.get("id")
-        if espn_id is None:
-            continue
-        name    = p.get("fullName") or p.get("player", {}).get("fullName", "")
-        pos     = POSITION_MAP.get(p.get("defaultPositionId", 0), "UNK")
+            digest = content_hash(fields)
+            prev   = existing.get(espn_id)
+            if prev and prev.get("content_hash") == digest and prev.get("eligible", True):
+                stats["unchanged"] += 1
+                continue
+            stats["changed" if prev else "added"] += 1
+
+            ops.append(UpdateOne(
+                {"espn_id": espn_id},
+                {"$set": {
+                    **fields,
+                    "espn_link":    f"https://www.espn.com/nfl/player/_/id/{espn_id}",
+                    "content_hash": digest,
+                    "eligible":     True,
+                }, "$unset": {"ineligible_since": ""}},
+                upsert=True
+            ))
+        if ops:
+            coll.bulk_write(ops, ordered=False)
+
+    total = meta.get("total")
+    complete = total is None or meta.get("received", 0) >= total
+    if not complete:
+        print(f"⚠️ Feed incomplete: received {meta.get('received')} of {total} players")
+
+    # Players that dropped out of the feed are kept but flagged, not left stale.
+    # Only trust "missing" when we know we saw the whole feed.
+    gone = [eid for eid, d in existing.items() if eid not in seen and d.get("eligible", True)]
+    if complete and seen and gone:
+        coll.update_many(
+            {"espn_id": {"$in": gone}},
+            {"$set": {"eligible": False, "ineligible_since": datetime.now(timezone.utc)}}
+        )
+        stats["removed"] = len(gone)
+
+    if stats["added"] or stats["changed"] or stats["removed"]:
+        bump_data_version("get_roster")
 
-        tid     = p.get("team", {}).get("id") or p.get("proTeamId")
-        
-        if not isinstance(tid, int) or tid == 0:
+    print(
+        f"Added: {stats['added']}, Changed: {stats['changed']}, "
+        f"Removed: {stats['removed']}, Unchanged: {stats['unchanged']}"
+    )
+    return stats
+
+def reload_players_to_mongo(season: int = SEASON):
+    """
+    Rebuild the whole players collection from the feed and swap it in with
+    renameCollection, so readers never see a partial roster. Fields written by
+    other scripts (latest_game, …) are carried over from the live documents,
+    and after the swap latest_game and the team tables are rebuilt from
+    player_games, so an ingest that ran meanwhile isn't reverted and the
+    reload can run at any time. Nothing is swapped if the feed came back short.
+    """
+    db   = get_db(DB_NAME)
+    coll = db[COLLECTION_NAME]
+
+    team_info = fetch_team_info(season, VALID_TEAM_IDS, db)
+    existing  = {d["espn_id"]: d for d in coll.find({}, {"_id": 0})}
+
+    docs  = {}
+    stats = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+    meta  = {}
+    now   = datetime.now(timezone.utc)
+
+    for page in iter_espn_player_pages(season, meta):
+        for p in page:
+            fields = player_fields(p, team_info)
+            if fields is None or p["id"] in docs:
+                continue
+            espn_id = p["id"]
+            digest  = content_hash(fields)
+            prev    = existing.get(espn_id)
+            if prev and prev.get("content_hash") == digest and prev.get("eligible", True):
+                stats["unchanged"] += 1
+            else:
+                stats["changed" if prev else "added"] += 1
+            doc = {k: v for k, v in (prev or {}).items() if k != "ineligible_since"}
+            doc.update(fields)
+            doc.update({
+                "espn_id":      espn_id,
+                "espn_link":    f"https://www.espn.com/nfl/player/_/id/{espn_id}",
+                "content_hash": digest,
+                "eligible":     True,
+            })
+            docs[espn_id] = doc
+
+    total = meta.get("total")
+    if total is not None and meta.get("received", 0) < total:
+        print(f"⚠️ Feed incomplete: received {meta.get('received')} of {total} players; keeping the live collection")
+        return None
+
+    # Players that dropped out of the feed are kept but flagged, as in the incremental sync
+    for espn_id, prev in existing.items():
+        if espn_id in docs:
             continue
-        tinfo   = team_info.get(tid, {"abbrev":"UNK","logo":None})
-
-        set_fields = {
-            "name":      name,
-            "position":  pos,
-            "team":      tinfo["abbrev"],
-            "espn_link": f"https://www.espn.com/nfl/player/_/id/{espn_id}",
-            "headshot_url": f"https://a.espncdn.com/i/headshots/nfl/players/full/{espn_id}.png"
-        }
-        set_on_insert = {"eligible": True}
-        headshot = p.get("player", {}).get("headshot", {}).get("url")
-        if headshot:
-            set_on_insert["headshot_url"] = headshot
-
-        ops.append(UpdateOne(
-            {"espn_id": espn_id},
-            {"$set": set_fields, "$setOnInsert": set_on_insert},
-            upsert=True
-        ))
+        if prev.get("eligible", True):
+            stats["removed"] += 1
+            prev = {**prev, "eligible": False, "ineligible_since": now}
+        docs[espn_id] = prev
 
-    if ops:
-        res = coll.bulk_write(ops)
-        print(f"Upserted: {res.upserted_count}, Modified: {res.modified_count}")
-    else:
-        print("No players found to sync.")
+    n = replace_collection(DB_NAME, COLLECTION_NAME, docs.values(), INDEXES[(DB_NAME, COLLECTION_NAME)])
+    if n:
+        # player_games is the source of truth for anything ingest wrote during the reload
+        refresh_latest_games()
+        refresh_tables_for_players()
+        bump_data_version("get_roster")
+
+    print(
+        f"Reloaded {n} players. Added: {stats['added']}, Changed: {stats['changed']}, "
+        f"Removed: {stats['removed']}, Unchanged: {stats['unchanged']}"
+    )
+    return stats
 
 if __name__ == "__main__":
-    sync_players_to_mongo()
+    from metrics import script_run
+    from profiling import profiled
+
+    parser = argparse.ArgumentParser(description="Sync the ESPN roster into fantasy_football.players.")
+    parser.add_argument("--full-reload", action="store_true",
+                        help="rebuild the collection in staging and swap it in atomically")
+    parser.add_argument("--profile", action="store_true", help="write a cProfile capture to data/profiles")
+    args = parser.parse_args()
+
+    with script_run("get_roster") as run, profiled("get_roster", args.profile):
+        stats = (reload_players_to_mongo if args.full_reload else sync_players_to_mongo)()
+        if stats:
+            run.rows = stats["added"] + stats["changed"] + stats["removed"]
@@ -2,10 +2,12 @@
 import os
 import json
 from collections import defaultdict
-from pymongo import MongoClient
+from db import get_db
+from updates import publish_updates, bump_data_version
+from tables import refresh_tables_for_players
+from games import player_games_collection, upsert_game_op, refresh_latest_games, refresh_game_summaries
 
 # ——— CONFIG ———
-MONGO_URI       = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 DB_NAME         = "fantasy_football"
 COLLECTION_NAME = "players"
 DATA_DIR        = "data/nfl"   # folder containing individual game JSON files
@@ -34,11 +36,8 @@ def compute_ev(line: float, odds_over: float, odds_under: float) -> float:
     p_under/= total
     return round(p_over * (line + 0.5) + p_under * (line - 0.5), 2)
 
-def update_players_with_games_from_dir(data_dir: str):
-    client       = MongoClient(MONGO_URI)
-    players_coll = client[DB_NAME][COLLECTION_NAME]
-
-    # Build name index: name_lower → list of {espn_id, team, position}
+def build_name_index(players_coll):
+    # name_lower → list of {espn_id, team, position}
     name_index = defaultdict(list)
     for doc in players_coll.find(
         {"position": {"$in": ["QB", "RB", "WR", "TE"]}},
@@ -49,27 +48,93 @@ def update_players_with_games_from_dir(data_dir: str):
             "team":    norm_team(doc.get("team")),
             "position":doc.get("position"),
         })
-
-    def resolve_for_prop(player_name: str, prop_key: str, home_abbr: str, away_abbr: str):
-        """
-        Resolve a single espn_id for THIS prop only, using:
-        - exact name match (case-insensitive)
-        - team in {home, away}
-        - position ∈ POSITIONS_BY_PROP[prop_key]
-        Returns espn_id or None if ambiguous/unknown.
-        """
-        cands = name_index.get(player_name.lower(), [])
-        if not cands:
-            return None
-        teams = {norm_team(home_abbr), norm_team(away_abbr)}
-        allowed_pos = set(POSITIONS_BY_PROP.get(prop_key, []))
-        filtered = [c for c in cands if c["team"] in teams and c["position"] in allowed_pos]
-        if len(filtered) == 1:
-            return filtered[0]["espn_id"]
-        # If still ambiguous, skip (don’t attach to multiple)
-        if len(filtered) > 1:
-            print(f"⚠️ Ambiguous '{player_name}' for {prop_key} in {teams}: {filtered}")
+    return name_index
+
+def resolve_for_prop(name_index, player_name: str, prop_key: str, home_abbr: str, away_abbr: str):
+    """
+    Resolve a single espn_id for THIS prop only, using:
+    - exact name match (case-insensitive)
+    - team in {home, away}
+    - position ∈ POSITIONS_BY_PROP[prop_key]
+    Returns espn_id or None if ambiguous/unknown.
+    """
+    cands = name_index.get(player_name.lower(), [])
+    if not cands:
         return None
+    teams = {norm_team(home_abbr), norm_team(away_abbr)}
+    allowed_pos = set(POSITIONS_BY_PROP.get(prop_key, []))
+    filtered = [c for c in cands if c["team"] in teams and c["position"] in allowed_pos]
+    if len(filtered) == 1:
+        return filtered[0]["espn_id"]
+    # If still ambiguous, skip (don’t attach to multiple)
+    if len(filtered) > 1:
+        print(f"⚠️ Ambiguous '{player_name}' for {prop_key} in {teams}: {filtered}")
+    return None
+
+def sides_from_game(game: dict, bookmaker: str = "draftkings"):
+    """Over/under prices and line per name, per prop, for one bookmaker."""
+    sides_by_prop = {}
+    book = next((b for b in game.get("bookmakers", []) if b.get("key") == bookmaker), None)
+    if not book:
+        return sides_by_prop
+
+    for market in book.get("markets", []):
+        prop_key = market.get("key")
+        if not prop_key:
+            continue
+
+        sides = defaultdict(lambda: {"over": None, "under": None, "line": None})
+        for outcome in market.get("outcomes", []):
+            side = str(outcome.get("name", "")).lower()   # "over"/"under"
+            name = outcome.get("description")
+            if not name:
+                continue
+            sides[name]["line"]  = outcome.get("point")
+            sides[name][side]    = outcome.get("price")
+        sides_by_prop[prop_key] = sides
+    return sides_by_prop
+
+def apply_game(games_coll, name_index, base_info: dict, sides_by_prop: dict):
+    # Collect projections keyed by resolved espn_id
+    ev_by_player_id = defaultdict(dict)
+
+    for prop_key, sides in sides_by_prop.items():
+        # For each name with both sides, resolve to espn_id for THIS prop
+        for name, sd in sides.items():
+            if sd["over"] and sd["under"] and sd["line"] is not None:
+                espn_id = resolve_for_prop(
+                    name_index, name, prop_key, base_info["home_team"], base_info["away_team"]
+                )
+                if not espn_id:
+                    continue
+                ev = compute_ev(sd["line"], sd["over"], sd["under"])
+                ev_by_player_id[espn_id][prop_key] = ev
+
+    # Upsert one player_games row per resolved espn_id, in one round trip
+    gid = base_info["game_id"]
+    ops, deltas = [], []
+    for espn_id, props in ev_by_player_id.items():
+        ops.append(upsert_game_op(espn_id, {**base_info, "projections": props}))
+        deltas.append({
+            "espn_id":       espn_id,
+            "game_id":       gid,
+            "commence_time": base_info["commence_time"],
+            "projections":   props,
+        })
+    if ops:
+        res = games_coll.bulk_write(ops, ordered=False)
+        print(f"✓ Game {gid}: {res.upserted_count} inserted, {res.matched_count} updated")
+
+    # Let open /nfl and /teams pages patch these rows in place
+    publish_updates(deltas)
+    return set(ev_by_player_id)
+
+def update_players_with_games_from_dir(data_dir: str):
+    players_coll = get_db(DB_NAME)[COLLECTION_NAME]
+    games_coll   = player_games_collection()
+    name_index   = build_name_index(players_coll)
+    touched      = set()
+    game_ids     = set()
 
     # Walk each game file
     for fname in os.listdir(data_dir):
@@ -85,64 +150,48 @@ def update_players_with_games_from_dir(data_dir: str):
             "home_team":     norm_team(game["home_team"]),
             "away_team":     norm_team(game["away_team"]),
         }
-
-        # Collect projections keyed by resolved espn_id
-        ev_by_player_id = defaultdict(dict)
-
-        # Use only DraftKings (or drop this if you want all books)
-        dk = next((b for b in game.get("bookmakers", []) if b.get("key") == "draftkings"), None)
-        if not dk:
-            continue
-
-        for market in dk.get("markets", []):
-            prop_key = market.get("key")
-            if not prop_key:
-                continue
-
-            # Build over/under per *name* for this prop
-            sides = defaultdict(lambda: {"over": None, "under": None, "line": None})
-            for outcome in market.get("outcomes", []):
-                side = str(outcome.get("name", "")).lower()   # "over"/"under"
-                name = outcome.get("description")
-                if not name:
-                    continue
-                sides[name]["line"]  = outcome.get("point")
-                sides[name][side]    = outcome.get("price")
-
-            # For each name with both sides, resolve to espn_id for THIS prop
-            for name, sd in sides.items():
-                if sd["over"] and sd["under"] and sd["line"] is not None:
-                    espn_id = resolve_for_prop(
-                        name, prop_key, base_info["home_team"], base_info["away_team"]
-                    )
-                    if not espn_id:
-                        continue
-                    ev = compute_ev(sd["line"], sd["over"], sd["under"])
-                    ev_by_player_id[espn_id][prop_key] = ev
-
-        # Upsert one record per resolved espn_id
-        for espn_id, props in ev_by_player_id.items():
-            record = {**base_info, "projections": props}
-            gid = record["game_id"]
-
-            res = players_coll.update_one(
-                {"espn_id": espn_id, "games.game_id": gid},
-                {"$set": {
-                    "games.$.projections":     props,
-                    "games.$.commence_time":   record["commence_time"],
-                    "games.$.home_team":       record["home_team"],
-                    "games.$.away_team":       record["away_team"],
-                }}
-            )
-            if res.matched_count:
-                print(f"✓ Updated espn_id={espn_id} for game {gid}")
-            else:
-                players_coll.update_one(
-                    {"espn_id": espn_id},
-                    {"$push": {"games": record}}
-                )
-                print(f"+ Inserted espn_id={espn_id} for game {gid}")
+        # Use only DraftKings (or pass another key if you want other books)
+        sides_by_prop = sides_from_game(game, "draftkings")
+        if sides_by_prop:
+            touched |= apply_game(games_coll, name_index, base_info, sides_by_prop)
+            game_ids.add(base_info["game_id"])
+
+    # Board rows, matchup pages and saved team tables that include any of these players are now stale
+    refresh_latest_games(touched)
+    refresh_game_summaries(game_ids)
+    refresh_tables_for_players(touched)
+    if touched:
+        bump_data_version("load_data")
+    return len(touched)
+
+def update_players_with_games_from_columnar(sport: str = "nfl", dates=None):
+    """Same as the directory loader, but reads the Parquet snapshots from columnar.py."""
+    from python_scripts.new_stuff.columnar import iter_game_sides
+
+    players_coll = get_db(DB_NAME)[COLLECTION_NAME]
+    games_coll   = player_games_collection()
+    name_index   = build_name_index(players_coll)
+
+    touched, game_ids = set(), set()
+    for base_info, sides_by_prop in iter_game_sides(sport, dates, bookmaker="draftkings"):
+        base_info["home_team"] = norm_team(base_info["home_team"])
+        base_info["away_team"] = norm_team(base_info["away_team"])
+        touched |= apply_game(games_coll, name_index, base_info, sides_by_prop)
+        game_ids.add(base_info["game_id"])
+
+    refresh_latest_games(touched)
+    refresh_game_summaries(game_ids)
+    refresh_tables_for_players(touched)
+    if touched:
+        bump_data_version("load_data")
+    return len(touched)
 
 if __name__ == "__main__":
-    update_players_with_games_from_dir(DATA_DIR)
+    from metrics import script_run
+    from profiling import profiled
+    with script_run("load_data") as run, profiled("load_data"):
+        if os.getenv("LOAD_FROM_COLUMNAR"):
+            run.rows = update_players_with_games_from_columnar("nfl")
+        else:
+            run.rows = update_players_with_games_from_dir(DATA_DIR)
     print("Done updating player documents from directory.")
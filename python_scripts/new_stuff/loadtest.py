@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Game-day load test: a weighted mix of board, team and extension traffic
+against gunicorn and a local MongoDB, repeated for each worker count.
+
+For every worker count it boots `gunicorn` on the test app factory below,
+logs each virtual user in through a stub login route (no Google OAuth), saves
+one team per user, then runs CLIENTS threads for DURATION seconds, optionally
+with an ingest looping alongside. Each endpoint gets throughput, p50/p95/p99
+latency and error rate.
+
+Run from the repo root (MONGO_URI should point at a disposable local database):
+    python -m python_scripts.new_stuff.loadtest --workers 1,2,4 --clients 32 --duration 30 \\
+        --mix nfl=50,teams=20,team_post=10,player=15,search=5 --ingest
+    python -m python_scripts.new_stuff.loadtest --url http://127.0.0.1:5000   # existing server
+"""
+import os
+import sys
+import json
+import time
+import random
+import signal
+import argparse
+import threading
+import subprocess
+from collections import defaultdict
+
+import requests
+
+# ——— CONFIG ———
+BIND          = os.getenv("LOADTEST_BIND", "127.0.0.1:18766")
+WORKERS       = "1,2,4"
+CLIENTS       = 16
+USERS         = 50
+DURATION      = 20
+WARMUP        = 3
+BOOT_TIMEOUT  = 30
+SEED          = 7
+DEFAULT_MIX   = "nfl=50,teams=20,team_post=10,player=15,search=5"
+TEAM_SIZE     = 16
+INGEST_CMD    = [sys.executable, "-m", "python_scripts.new_stuff.generate_data", "--emit", "mongo", "--weeks", "1"]
+LOGIN_PATH    = "/__loadtest/login"
+
+
+def test_app():
+    """
+    gunicorn factory: the real app plus a login route that skips OAuth.
+    Only ever served by this harness (it refuses to build without LOADTEST=1).
+    """
+    if os.getenv("LOADTEST") != "1":
+        raise RuntimeError("test_app() is for the load-test harness only (set LOADTEST=1)")
+
+    from flask import request
+    from flask_login import login_user
+    from pymongo import ReturnDocument
+    from app import app, User, users_collection
+
+    @app.route(LOGIN_PATH)
+    def loadtest_login():
+        email = request.args["email"]
+        doc = users_collection().find_one_and_update(
+            {"email": email}, {"$setOnInsert": {"email": email}},
+            upsert=True, return_document=ReturnDocument.AFTER,
+        )
+        login_user(User(doc))
+        return "ok"
+
+    return app
+
+
+# ——— traffic ———
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise SystemExit(f"unknown endpoint in mix: {name!r} (known: {', '.join(ENDPOINTS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+class VirtualUser:
+    def __init__(self, base, idx, pool, rnd):
+        self.base    = base
+        self.email   = f"loadtest{idx}@example.com"
+        self.team_id = str(idx)
+        self.pool    = pool
+        self.rnd     = rnd
+        self.http    = requests.Session()
+
+    def login(self):
+        self.http.get(self.base + LOGIN_PATH, params={"email": self.email}, timeout=10).raise_for_status()
+
+    def team_payload(self):
+        players = self.rnd.sample(self.pool, min(TEAM_SIZE, len(self.pool)))
+        return {
+            "email":      self.email,
+            "teamName":   f"Load Test {self.team_id}",
+            "seasonId":   2025,
+            "leagueId":   "loadtest",
+            "leagueName": "Load Test League",
+            "teamId":     self.team_id,
+            "players":    [{"espnId": p["espn_id"], "name": p["name"], "team": p["team"]} for p in players],
+        }
+
+def hit_nfl(u):
+    return u.http.get(u.base + "/nfl", params={"scoring": u.rnd.choice(["espn_ppr", "espn_half", "espn_std"])}, timeout=30)
+
+def hit_teams(u):
+    return u.http.get(u.base + "/teams", timeout=30, allow_redirects=False)
+
+def hit_team_post(u):
+    return u.http.post(u.base + "/api/team", json=u.team_payload(), timeout=30)
+
+def hit_player(u):
+    p = u.rnd.choice(u.pool)
+    return u.http.get(f"{u.base}/nfl/players/{p['espn_id']}", timeout=30)
+
+def hit_search(u):
+    return u.http.get(u.base + "/api/nfl/search-index", timeout=30)
+
+ENDPOINTS = {
+    "nfl":       hit_nfl,
+    "teams":     hit_teams,
+    "team_post": hit_team_post,
+    "player":    hit_player,
+    "search":    hit_search,
+}
+
+
+def percentile(sorted_vals, q):
+    if not sorted_vals:
+        return 0.0
+    k = min(len(sorted_vals) - 1, max(0, int(round(q / 100 * (len(sorted_vals) - 1)))))
+    return sorted_vals[k]
+
+def run_load(base, mix, clients=CLIENTS, users=USERS, duration=DURATION, warmup=WARMUP, seed=SEED):
+    """Drive the mix against base; returns {endpoint: stats} plus an "all" row."""
+    pool = [p for p in requests.get(base + "/api/nfl/search-index", timeout=60).json() if p.get("espn_id")]
+    if not pool:
+        raise SystemExit("no players in the database; seed it first (generate_data --emit mongo)")
+
+    # at least one user per client, so no session is shared between threads
+    vusers = [VirtualUser(base, i, pool, random.Random(seed + i)) for i in range(max(users, clients))]
+    for u in vusers:
+        u.login()
+        u.http.post(base + "/api/team", json=u.team_payload(), timeout=30).raise_for_status()
+
+    names   = list(mix)
+    weights = [mix[n] for n in names]
+    samples = defaultdict(list)      # endpoint → [(seconds, ok)]
+    lock    = threading.Lock()
+    start   = time.perf_counter()
+    measure_from = start + warmup
+    stop_at      = measure_from + duration
+
+    def client(cid):
+        rnd = random.Random(seed * 1000 + cid)
+        mine = vusers[cid::clients]
+        local = defaultdict(list)
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                break
+            u = mine[rnd.randrange(len(mine))]
+            name = rnd.choices(names, weights)[0]
+            t0 = time.perf_counter()
+            try:
+                ok = ENDPOINTS[name](u).status_code < 400
+            except requests.RequestException:
+                ok = False
+            t1 = time.perf_counter()
+            if t0 >= measure_from:
+                local[name].append((t1 - t0, ok))
+        with lock:
+            for k, v in local.items():
+                samples[k].extend(v)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    report = {}
+    every = []
+    for name in names + ["all"]:
+        rows = every if name == "all" else samples.get(name, [])
+        if name != "all":
+            every.extend(rows)
+        lat = sorted(s for s, _ in rows)
+        errors = sum(1 for _, ok in rows if not ok)
+        report[name] = {
+            "requests": len(rows),
+            "rps":      round(len(rows) / duration, 1),
+            "p50_ms":   round(percentile(lat, 50) * 1000, 1),
+            "p95_ms":   round(percentile(lat, 95) * 1000, 1),
+            "p99_ms":   round(percentile(lat, 99) * 1000, 1),
+            "error_pct": round(100.0 * errors / len(rows), 2) if rows else 0.0,
+        }
+    return report
+
+
+# ——— servers and ingest ———
+
+def start_gunicorn(workers, bind=BIND):
+    env = dict(os.environ, LOADTEST="1")
+    env.setdefault("GOOGLE_OAUTH_CLIENT_ID", "loadtest")
+    env.setdefault("GOOGLE_OAUTH_CLIENT_SECRET", "loadtest")
+    proc = subprocess.Popen(
+        ["gunicorn", "python_scripts.new_stuff.loadtest:test_app()", "-w", str(workers), "-b", bind,
+         "--threads", "1", "--timeout", "60"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    start = time.perf_counter()
+    while True:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {proc.returncode}")
+        if time.perf_counter() - start > BOOT_TIMEOUT:
+            stop(proc)
+            raise TimeoutError(f"gunicorn did not answer within {BOOT_TIMEOUT}s")
+        try:
+            requests.get(f"http://{bind}/metrics", timeout=1)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.2)
+
+def stop(proc):
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+class IngestLoop:
+    """Re-runs an ingest command back to back until stopped."""
+    def __init__(self, cmd=INGEST_CMD):
+        self.cmd    = cmd
+        self.runs   = 0
+        self.failed = 0
+        self._stop  = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            rc = subprocess.run(self.cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode
+            self.runs += 1
+            self.failed += rc != 0
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def print_report(title, report):
+    print(f"\n{title}")
+    print(f"  {'endpoint':<10} {'reqs':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'err %':>7}")
+    for name, r in report.items():
+        print(f"  {name:<10} {r['requests']:>7} {r['rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} "
+              f"{r['p99_ms']:>8} {r['error_pct']:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mixed read/write load test against gunicorn.")
+    parser.add_argument("--workers", default=WORKERS, help="comma-separated gunicorn worker counts")
+    parser.add_argument("--clients", type=int, default=CLIENTS, help="concurrent client threads")
+    parser.add_argument("--users", type=int, default=USERS, help="distinct logged-in users")
+    parser.add_argument("--duration", type=float, default=DURATION, help="measured seconds per run")
+    parser.add_argument("--warmup", type=float, default=WARMUP)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint=weight,...")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--ingest", action="store_true", help="loop an ingest (generate_data --emit mongo) during each run")
+    parser.add_argument("--url", help="test an already running server instead of starting gunicorn")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    targets = [(args.url, None)] if args.url else [(None, int(w)) for w in args.workers.split(",")]
+    results = {}
+    for url, workers in targets:
+        proc = start_gunicorn(workers) if url is None else None
+        base = url or f"http://{BIND}"
+        label = f"{workers} worker(s)" if workers else base
+        try:
+            if args.ingest:
+                with IngestLoop() as ingest:
+                    report = run_load(base, mix, args.clients, args.users, args.duration, args.warmup, args.seed)
+                label += f", {ingest.runs} ingest run(s), {ingest.failed} failed"
+            else:
+                report = run_load(base, mix, args.clients, args.users, args.duration, args.warmup, args.seed)
+        finally:
+            if proc:
+                stop(proc)
+        results[str(workers or base)] = report
+        print_report(f"{label}, {args.clients} clients, {args.duration:g}s:", report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"mix": mix, "clients": args.clients, "results": results}, f, indent=2)
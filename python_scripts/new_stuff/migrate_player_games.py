@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Move embedded players.games arrays into fantasy_football.player_games.
+
+Rows are inserted with $setOnInsert, so re-running never overwrites a row
+ingest has written since; each batch's embedded arrays are $unset only after
+its rows are written (pass --keep-embedded to leave them in place).
+
+Run from the repo root:
+    python -m python_scripts.new_stuff.migrate_player_games [--keep-embedded]
+"""
+import argparse
+from pymongo import UpdateOne
+
+from db import get_db
+from games import player_games_collection, game_tags, refresh_latest_games, refresh_game_summaries
+from indexes import INDEXES
+from updates import bump_data_version
+
+# ——— CONFIG ———
+DB_NAME    = "fantasy_football"
+BATCH_SIZE = 200   # players per bulk write
+
+
+def game_ops(espn_id, games):
+    ops = []
+    for g in games or []:
+        if not isinstance(g, dict) or not g.get("game_id"):
+            continue
+        row = {k: v for k, v in g.items() if k not in ("_id", "espn_id", "game_id")}
+        row.update(game_tags(g.get("commence_time")))
+        ops.append(UpdateOne(
+            {"espn_id": espn_id, "game_id": g["game_id"]},
+            {"$setOnInsert": row},
+            upsert=True,
+        ))
+    return ops
+
+def migrate(keep_embedded=False):
+    db      = get_db(DB_NAME)
+    players = db["players"]
+    games   = player_games_collection()
+    games.create_indexes(INDEXES[(DB_NAME, "player_games")])
+
+    stats = {"players": 0, "rows": 0, "inserted": 0}
+    migrated = []
+
+    def flush(batch_ids, ops):
+        if ops:
+            res = games.bulk_write(ops, ordered=False)
+            stats["inserted"] += res.upserted_count
+        if batch_ids and not keep_embedded:
+            players.update_many({"espn_id": {"$in": batch_ids}}, {"$unset": {"games": ""}})
+
+    batch_ids, ops = [], []
+    cursor = players.find({"games.0": {"$exists": True}}, {"espn_id": 1, "games": 1})
+    for doc in cursor:
+        doc_ops = game_ops(doc["espn_id"], doc.get("games"))
+        stats["players"] += 1
+        stats["rows"]    += len(doc_ops)
+        batch_ids.append(doc["espn_id"])
+        ops.extend(doc_ops)
+        if len(batch_ids) >= BATCH_SIZE:
+            flush(batch_ids, ops)
+            migrated.extend(batch_ids)
+            batch_ids, ops = [], []
+    flush(batch_ids, ops)
+    migrated.extend(batch_ids)
+
+    refresh_latest_games(migrated)
+    refresh_game_summaries()
+    if migrated:
+        bump_data_version("migrate_player_games")
+
+    print(f"Players: {stats['players']}, game rows: {stats['rows']}, newly inserted: {stats['inserted']}")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move embedded player games into player_games.")
+    parser.add_argument("--keep-embedded", action="store_true", help="leave players.games in place")
+    args = parser.parse_args()
+    migrate(keep_embedded=args.keep_embedded)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Run the fetch → load → score scripts as a dependency graph, in one process.
+
+    roster ──┬──────────────► load ──► score ──► archive
+             └─► generate* ─┤
+    odds ───────────────────┴─► export
+
+Stages whose dependencies are done run concurrently on a small thread pool.
+Failed stages are retried with backoff; anything downstream of a stage that
+still fails is marked blocked. A stage is skipped when its input fingerprint
+(its own inputs plus its upstream stages' outputs) matches the last
+successful run recorded in the state file. Every run records per-stage
+status, attempts, duration and row counts.
+
+Run from the repo root:
+    python -m python_scripts.new_stuff.pipeline [--force] [--generate] [--profile] [--only load,score]
+
+* generate (fake NFL slate) only runs with --generate.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# ——— CONFIG ———
+STATE_FILE   = os.getenv("PIPELINE_STATE_FILE", "data/.pipeline_state.json")
+MAX_WORKERS  = int(os.getenv("PIPELINE_WORKERS", 3))
+RETRIES      = int(os.getenv("PIPELINE_RETRIES", 2))
+BACKOFF_SECS = float(os.getenv("PIPELINE_BACKOFF_SECS", 5))
+KEEP_RUNS    = 50
+NFL_DIR      = "data/nfl"
+MLB_DIR      = "data/mlb"
+
+
+def dir_fingerprint(path):
+    """Names, sizes and mtimes of the JSON files in a directory."""
+    if not os.path.isdir(path):
+        return None
+    entries = []
+    for fname in sorted(os.listdir(path)):
+        if fname.lower().endswith(".json"):
+            st = os.stat(os.path.join(path, fname))
+            entries.append((fname, st.st_size, int(st.st_mtime)))
+    return entries
+
+def today():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+# ——— stage bodies (imported lazily so one stage's deps don't slow the others) ———
+
+def run_roster():
+    from python_scripts.new_stuff.get_roster import sync_players_to_mongo
+    stats = sync_players_to_mongo()
+    return stats["added"] + stats["changed"] + stats["removed"]
+
+def run_odds():
+    from python_scripts.the_odds import get_today_data
+    return get_today_data()
+
+def run_generate():
+    from python_scripts.new_stuff.generate_data import generate_fake_nfl_slate, write_slate
+    return write_slate(generate_fake_nfl_slate(), NFL_DIR)
+
+def run_export():
+    from python_scripts.new_stuff.columnar import export_dir
+    return sum(export_dir(src, sport) for sport, src in (("nfl", NFL_DIR), ("mlb", MLB_DIR)) if os.path.isdir(src))
+
+def run_load():
+    from python_scripts.new_stuff.load_data import update_players_with_games_from_dir
+    return update_players_with_games_from_dir(NFL_DIR)
+
+def run_score():
+    from python_scripts.new_stuff.compute_projections import backfill
+    return backfill()
+
+def run_archive():
+    from games import archive_weeks
+    return sum(archive_weeks().values())
+
+def this_week():
+    from games import current_season_week
+    return list(current_season_week())
+
+
+class Stage:
+    def __init__(self, name, run, deps=(), inputs=None):
+        self.name   = name
+        self.run    = run
+        self.deps   = tuple(deps)
+        # Callable returning this stage's own inputs; None means "always run"
+        self.inputs = inputs
+
+def build_stages(with_generate=False):
+    stages = [
+        # External feeds: at most once a day unless forced
+        Stage("roster", run_roster, inputs=today),
+        Stage("odds",   run_odds,   inputs=today),
+        Stage("export", run_export, deps=["odds"],
+              inputs=lambda: [dir_fingerprint(NFL_DIR), dir_fingerprint(MLB_DIR)]),
+        Stage("load",   run_load,   deps=["roster"], inputs=lambda: dir_fingerprint(NFL_DIR)),
+        Stage("score",  run_score,  deps=["load"], inputs=lambda: []),
+        # completed weeks only change when the week rolls over
+        Stage("archive", run_archive, deps=["score"], inputs=this_week),
+    ]
+    if with_generate:
+        stages.insert(1, Stage("generate", run_generate, deps=["roster"]))
+        for s in stages:
+            if s.name in ("load", "export"):
+                s.deps += ("generate",)
+    return {s.name: s for s in stages}
+
+
+def load_state():
+    try:
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"fingerprints": {}, "runs": []}
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_FILE) or ".", exist_ok=True)
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2, default=str)
+    os.replace(tmp, STATE_FILE)
+
+def fingerprint(stage, upstream):
+    if stage.inputs is None:
+        return None
+    payload = json.dumps({"inputs": stage.inputs(), "upstream": upstream}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def run_with_retries(stage, profile=False):
+    from metrics import script_run
+    from profiling import profiled
+    start = time.perf_counter()
+    for attempt in range(1, RETRIES + 2):
+        try:
+            with script_run(stage.name) as run, profiled(stage.name, profile):
+                rows = run.rows = stage.run()
+            return {"status": "ok", "attempts": attempt, "rows": rows,
+                    "seconds": round(time.perf_counter() - start, 3)}
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"✗ {stage.name} attempt {attempt} failed: {error}")
+            if attempt <= RETRIES:
+                time.sleep(BACKOFF_SECS * 2 ** (attempt - 1))
+    return {"status": "failed", "attempts": attempt, "error": error,
+            "seconds": round(time.perf_counter() - start, 3)}
+
+
+def run_pipeline(stages, force=False, profile=False):
+    state   = load_state()
+    fps     = state.setdefault("fingerprints", {})
+    results = {}
+    pending = dict(stages)
+    running = {}
+
+    # Only one cProfile capture can run at a time, so profiled runs go one stage at a time
+    with ThreadPoolExecutor(max_workers=1 if profile else MAX_WORKERS) as pool:
+        while pending or running:
+            # Start (or settle) every stage whose deps are finished
+            for name, stage in list(pending.items()):
+                deps = [results.get(d) for d in stage.deps if d in stages]
+                if any(r is None for r in deps):
+                    continue
+                del pending[name]
+                if any(r["status"] in ("failed", "blocked") for r in deps):
+                    results[name] = {"status": "blocked"}
+                    print(f"⏸ {name} blocked")
+                    continue
+
+                fp = fingerprint(stage, {d: fps.get(d) for d in stage.deps})
+                if not force and fp is not None and fps.get(name) == fp:
+                    results[name] = {"status": "skipped", "fingerprint": fp}
+                    print(f"↷ {name} skipped (inputs unchanged)")
+                    continue
+                print(f"▶ {name}")
+                running[pool.submit(run_with_retries, stage, profile)] = (name, fp)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name, fp = running.pop(fut)
+                res = fut.result()
+                results[name] = res
+                if res["status"] == "ok":
+                    # Recompute after the run so outputs this stage wrote are included
+                    fps[name] = fingerprint(stages[name], {d: fps.get(d) for d in stages[name].deps}) or \
+                        f"run-{datetime.now(timezone.utc).isoformat()}"
+                    print(f"✓ {name}: {res['rows']} rows in {res['seconds']}s")
+
+    state["runs"] = (state.get("runs", []) + [{
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "stages": results,
+    }])[-KEEP_RUNS:]
+    save_state(state)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the fantasy data pipeline.")
+    parser.add_argument("--force", action="store_true", help="run every stage even if inputs are unchanged")
+    parser.add_argument("--generate", action="store_true", help="include the fake NFL slate generator")
+    parser.add_argument("--profile", action="store_true", help="write a cProfile capture per stage to data/profiles")
+    parser.add_argument("--only", help="comma-separated stage names to run (deps must already be current)")
+    args = parser.parse_args()
+
+    stages = build_stages(with_generate=args.generate)
+    if args.only:
+        keep = set(args.only.split(","))
+        stages = {k: v for k, v in stages.items() if k in keep}
+
+    results = run_pipeline(stages, force=args.force, profile=args.profile)
+    print(json.dumps(results, indent=2, default=str))
+    sys.exit(1 if any(r["status"] in ("failed", "blocked") for r in results.values()) else 0)
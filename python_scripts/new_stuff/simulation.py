@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo fantasy-point distributions from over/under prices.
+
+compute_ev collapses each prop to line ± 0.5. Here each prop gets a
+distribution fitted to its no-vig over probability instead:
+
+    count props (TDs, receptions)  Poisson(λ) with P(X > line) = p_over
+    yardage props                  Normal(μ, σ) with P(X > line) = p_over,
+                                   σ = YARDS_CV[market] × line (floored)
+
+Every prop of every player on the slate is sampled at once as NumPy arrays,
+then weighted and summed per player for each scoring profile, giving
+p10/p50/p90 fantasy points. Props are sampled independently (no correlation
+between e.g. receptions and receiving yards), so the spread is a lower bound.
+
+Results are cached on disk per slate version (the Parquet snapshot files'
+sizes and mtimes) plus seed and simulation count, so re-runs are free.
+
+Run from the repo root:
+    python -m python_scripts.new_stuff.simulation [--sims 5000] [--seed 7] [--dates 2025-09-07]
+"""
+import os
+import time
+import glob
+import hashlib
+import argparse
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+# ——— CONFIG ———
+SIM_CACHE_DIR = os.getenv("SIM_CACHE_DIR", "data/simulations")
+N_SIMS        = 5000
+SEED          = 7
+BOOKMAKER     = "draftkings"
+CHUNK_ROWS    = 512                  # prop rows sampled per block (bounds memory)
+PERCENTILES   = (10, 50, 90)
+MODEL_VERSION = 1                    # bump when the fitting changes, to invalidate caches
+
+COUNT_MARKETS = {"player_pass_tds", "player_rush_tds", "player_reception_tds", "player_receptions"}
+YARDS_CV = {
+    "player_pass_yds":      0.25,
+    "player_rush_yds":      0.45,
+    "player_reception_yds": 0.50,
+}
+YARDS_SIGMA_FLOOR = 8.0
+POISSON_MAX_K     = 40               # truncation for the CDF when solving λ
+
+
+def no_vig_over(over, under):
+    """Decimal prices → probability of the over with the bookmaker margin removed."""
+    p_over, p_under = 1.0 / over, 1.0 / under
+    return p_over / (p_over + p_under)
+
+def poisson_cdf(k, lam):
+    """P(X <= k) for arrays of integer k and rate lam."""
+    ks = np.arange(POISSON_MAX_K + 1)
+    log_pmf = ks[None, :] * np.log(lam[:, None]) - lam[:, None] - np.cumsum(np.log(np.maximum(ks, 1)))[None, :]
+    pmf = np.exp(log_pmf)
+    return np.where(ks[None, :] <= k[:, None], pmf, 0.0).sum(axis=1)
+
+def fit_poisson(line, p_over, iters=60):
+    """λ such that P(X > line) = p_over, by vectorized bisection (CDF falls as λ grows)."""
+    k = np.floor(line).astype(int)
+    target = 1.0 - p_over
+    lo = np.full(line.shape, 1e-6)
+    hi = np.full(line.shape, float(POISSON_MAX_K) / 2)
+    for _ in range(iters):
+        mid = (lo + hi) / 2
+        too_low = poisson_cdf(k, mid) > target   # λ too small: too much mass at or below line
+        lo = np.where(too_low, mid, lo)
+        hi = np.where(too_low, hi, mid)
+    return (lo + hi) / 2
+
+def fit_normal(market, line, p_over):
+    cv = np.array([YARDS_CV.get(m, 0.4) for m in market])
+    sigma = np.maximum(cv * line, YARDS_SIGMA_FLOOR)
+    z = np.array([NormalDist().inv_cdf(min(max(p, 1e-6), 1 - 1e-6)) for p in p_over])
+    return line + sigma * z, sigma
+
+def fit_props(wide: pd.DataFrame) -> pd.DataFrame:
+    """Add the fitted distribution parameters to columnar.paired_lines output."""
+    df = wide.copy()
+    df["p_over"] = no_vig_over(df["over"].to_numpy(float), df["under"].to_numpy(float))
+    df["kind"] = np.where(df["market"].isin(COUNT_MARKETS), "poisson", "normal")
+    df["lam"] = np.nan
+    df["mu"] = np.nan
+    df["sigma"] = np.nan
+
+    pois = df["kind"] == "poisson"
+    if pois.any():
+        df.loc[pois, "lam"] = fit_poisson(df.loc[pois, "point"].to_numpy(float), df.loc[pois, "p_over"].to_numpy(float))
+    norm = ~pois
+    if norm.any():
+        mu, sigma = fit_normal(df.loc[norm, "market"].to_numpy(), df.loc[norm, "point"].to_numpy(float),
+                               df.loc[norm, "p_over"].to_numpy(float))
+        df.loc[norm, "mu"] = mu
+        df.loc[norm, "sigma"] = sigma
+    return df
+
+def sample_block(rng, block: pd.DataFrame, n_sims: int) -> np.ndarray:
+    out = np.empty((len(block), n_sims), dtype=np.float32)
+    pois = (block["kind"] == "poisson").to_numpy()
+    if pois.any():
+        lam = block["lam"].to_numpy(float)[pois]
+        out[pois] = rng.poisson(lam[:, None], (len(lam), n_sims))
+    if (~pois).any():
+        mu = block["mu"].to_numpy(float)[~pois]
+        sigma = block["sigma"].to_numpy(float)[~pois]
+        out[~pois] = np.maximum(rng.standard_normal((len(mu), n_sims), dtype=np.float32) * sigma[:, None] + mu[:, None], 0.0)
+    return out
+
+def simulate(wide: pd.DataFrame, profiles: dict, n_sims: int = N_SIMS, seed: int = SEED) -> pd.DataFrame:
+    """
+    wide: one row per (game_id, player, market) with over/under/point.
+    Returns one row per (game_id, player) with <profile>_p10/_p50/_p90 and _mean.
+    """
+    fitted = fit_props(wide).sort_values(["game_id", "player", "market"]).reset_index(drop=True)
+    keys = fitted[["game_id", "player"]]
+    # first prop row of each player; players never straddle a block below
+    starts = np.flatnonzero(~keys.duplicated().to_numpy())
+    bounds = list(starts) + [len(fitted)]
+
+    rng = np.random.default_rng(seed)
+    weights = {name: fitted["market"].map(w).fillna(0.0).to_numpy(np.float32) for name, w in profiles.items()}
+    results = {name: [] for name in profiles}
+
+    i = 0
+    while i < len(starts):
+        # take whole players until the block reaches CHUNK_ROWS prop rows
+        j = i + 1
+        while j < len(starts) and bounds[j + 1] - bounds[i] <= CHUNK_ROWS:
+            j += 1
+        lo, hi = bounds[i], bounds[j]
+        samples = sample_block(rng, fitted.iloc[lo:hi], n_sims)
+        offsets = np.array(bounds[i:j]) - lo
+        for name in profiles:
+            totals = np.add.reduceat(samples * weights[name][lo:hi, None], offsets, axis=0)
+            pct = np.percentile(totals, PERCENTILES, axis=1)
+            results[name].append(np.vstack([pct, totals.mean(axis=1)[None, :]]).T)
+        i = j
+
+    out = keys.iloc[starts].reset_index(drop=True)
+    meta = fitted.iloc[starts][["commence_time", "home_team", "away_team"]].reset_index(drop=True)
+    out = pd.concat([out, meta], axis=1)
+    for name, blocks in results.items():
+        arr = np.vstack(blocks) if blocks else np.empty((0, len(PERCENTILES) + 1))
+        for col, p in enumerate(PERCENTILES):
+            out[f"{name}_p{p}"] = arr[:, col].round(2)
+        out[f"{name}_mean"] = arr[:, -1].round(2)
+    return out
+
+
+def slate_version(sport: str, dates=None) -> str:
+    """Fingerprint of the snapshot partitions a simulation reads."""
+    from python_scripts.new_stuff.columnar import COLUMNAR_DIR
+
+    parts = []
+    for path in sorted(glob.glob(os.path.join(COLUMNAR_DIR, sport, "date=*", "*.parquet"))):
+        day = os.path.basename(os.path.dirname(path))[len("date="):]
+        if dates and day not in dates:
+            continue
+        st = os.stat(path)
+        parts.append(f"{path}:{st.st_size}:{int(st.st_mtime)}")
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+def simulate_slate(sport: str = "nfl", dates=None, n_sims: int = N_SIMS, seed: int = SEED,
+                   bookmaker: str = BOOKMAKER, use_cache: bool = True) -> pd.DataFrame:
+    from python_scripts.new_stuff.columnar import read_snapshots, paired_lines
+    from python_scripts.new_stuff.compute_projections import SCORING_PROFILES
+
+    key = f"{sport}-{slate_version(sport, dates)}-{bookmaker}-{n_sims}-{seed}-v{MODEL_VERSION}"
+    path = os.path.join(SIM_CACHE_DIR, f"{key}.parquet")
+    if use_cache and os.path.exists(path):
+        return pd.read_parquet(path)
+
+    df = read_snapshots(sport, dates)
+    df = df[df["bookmaker"] == bookmaker]
+    out = simulate(paired_lines(df), SCORING_PROFILES, n_sims, seed)
+
+    if use_cache:
+        os.makedirs(SIM_CACHE_DIR, exist_ok=True)
+        out.to_parquet(path, engine="pyarrow", index=False)
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate fantasy-point distributions for a slate.")
+    parser.add_argument("--sport", default="nfl")
+    parser.add_argument("--dates", nargs="*", help="snapshot dates (YYYY-MM-DD); default all")
+    parser.add_argument("--sims", type=int, default=N_SIMS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    out = simulate_slate(args.sport, args.dates, args.sims, args.seed, use_cache=not args.no_cache)
+    print(out.sort_values("espn_ppr_p50", ascending=False).head(25).to_string(index=False))
+    print(f"{len(out)} players simulated in {time.perf_counter() - start:.2f}s")
@@ -1,15 +1,16 @@
 import nfl_data_py as nfl
 import pandas as pd
-import pymongo
+from db import replace_collection
+from indexes import INDEXES
 
 # [season, team, position, depth_chart_position, jersey_number, status, player_name, first_name, last_name, birth_date, height, weight, college, player_id, espn_id, sportradar_id, yahoo_id, rotowire_id, pff_id, 
 # pfr_id, fantasy_data_id, sleeper_id, years_exp, headshot_url, ngs_position, week, game_type, status_description_abbr, football_name, esb_id, gsis_it_id, smart_id, entry_year, rookie_year, draft_club, draft_number, age]
 
 
 
-client = pymongo.MongoClient("mongodb://localhost:27017/")
-db = client["nfl_data"]
-players_collection = db["nfl_players"]
+DB_NAME         = "nfl_data"
+COLLECTION_NAME = "nfl_players"
+PROFILE_URL     = "https://www.espn.com/nfl/player/_/id/"
 
 players_df = nfl.import_seasonal_rosters([2024])
 active_players_df = players_df[(players_df['status'] == 'ACT')]
@@ -62,15 +63,11 @@ fields = [
 ]
 
 # Filter columns
-active_players_df = active_players_df[fields]
+active_players_df = active_players_df[fields].copy()
 
-# Optionally add profile URLs using ESPN ID (example format)
-def build_profile_url(row):
-    if pd.notna(row["espn_id"]):
-        return f"https://www.espn.com/nfl/player/_/id/{int(row['espn_id'])}"
-    return None
-
-active_players_df["profile_url"] = active_players_df.apply(build_profile_url, axis=1)
+# Profile URLs from the ESPN ID, as one column operation (None where there's no ID)
+espn_ids = pd.to_numeric(active_players_df["espn_id"], errors="coerce").astype("Int64")
+active_players_df["profile_url"] = (PROFILE_URL + espn_ids.astype("string")).astype(object).where(espn_ids.notna(), None)
 active_players_df["position"] = active_players_df["position"].map(position_map)
 active_players_df = active_players_df.dropna(subset=["position"])
 active_players_df["team"] = active_players_df["team"].map(nfl_team_codes)
@@ -78,10 +75,10 @@ active_players_df["team"] = active_players_df["team"].map(nfl_team_codes)
 # Convert to dicts for Mongo
 player_docs = active_players_df.to_dict("records")
 
-# Clear and reinsert if needed
-players_collection.delete_many({})  # optional: reset collection
-if player_docs:
-    players_collection.insert_many(player_docs)
-    print(f"Inserted {len(player_docs)} players.")
+# Build the new set in a staging collection and swap it in atomically, so
+# readers see the old players or the new ones, never an empty collection
+n = replace_collection(DB_NAME, COLLECTION_NAME, player_docs, INDEXES.get((DB_NAME, COLLECTION_NAME)))
+if n:
+    print(f"Inserted {n} players.")
 else:
-    print("No player documents to insert.")
\ No newline at end of file
+    print("No player documents to insert; kept the existing collection.")
\ No newline at end of file
@@ -3,9 +3,6 @@ from dotenv import load_dotenv
 from collections import defaultdict
 import os
 import json
-import statsapi
-import numpy as np
-import pandas as pd
 
 load_dotenv()
 SPORT = "baseball_mlb" #"americanfootball_nfl"
@@ -55,6 +52,9 @@ def get_odds(eventId, market):
         return []
 
 def parse_json(file, props, scores):
+    # pandas is only needed here; keep it off the import path of the fetch helpers
+    import pandas as pd
+
     with open(file, "r") as f:
         odds_data = json.load(f)
 
@@ -163,6 +163,7 @@ def get_today_data():
     events = get_events()
     
     teams = set()
+    written = 0
     
     for event in events:
         if len(teams) == TEAM_SIZE:
@@ -182,8 +183,9 @@ def get_today_data():
             
         with open(file, "w") as f:
             json.dump(get_odds(id, ",".join(espn_pitchers_props)), f, indent=2)
-            
-        
+        written += 1
+
+    return written
 
 #get_today_data()
 
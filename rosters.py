@@ -0,0 +1,37 @@
+"""
+Roster hashing and add/drop deltas for the extension's team sync.
+
+The hash must match what extention/popup.js computes: SHA-256 over the
+compact JSON of [espnId, name, team] triples sorted by player key.
+"""
+import json
+import hashlib
+
+
+def player_key(p: dict) -> str:
+    eid = p.get("espnId") or p.get("espn_id")
+    return str(eid) if eid else f"{p.get('name')}|{p.get('team')}"
+
+
+def clean_player(p: dict) -> dict:
+    eid = p.get("espnId") or p.get("espn_id")
+    return {
+        "espnId": str(eid) if eid else None,
+        "name":   p.get("name"),
+        "team":   (p.get("team") or "").upper() or None,
+    }
+
+
+def roster_hash(players: list) -> str:
+    cleaned = sorted((clean_player(p) for p in players), key=player_key)
+    rows = [[p["espnId"], p["name"], p["team"]] for p in cleaned]
+    payload = json.dumps(rows, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def apply_delta(players: list, add: list, drop: list) -> list:
+    """Drop players by key, then add (or replace) players by key."""
+    dropped = {str(k) for k in drop or []}
+    added   = {player_key(p): clean_player(p) for p in add or []}
+    out = [p for p in players if player_key(p) not in dropped and player_key(p) not in added]
+    return out + list(added.values())
@@ -131,6 +131,11 @@ document.addEventListener('DOMContentLoaded', () => {
       td.textContent = val;
     });
 
+    // optimal lineup card on /teams
+    document.querySelectorAll('.lineup-block').forEach(el => {
+      el.classList.toggle('d-none', el.dataset.scoring !== key);
+    });
+
     // button visual state + Tabler blue theme
     BUTTONS.forEach(btn => {
       const isActive = btn.dataset.scoring === key;
@@ -251,4 +256,69 @@ document.addEventListener('DOMContentLoaded', () => {
       menu.style.display = 'none';
     }
   });
-})();
\ No newline at end of file
+})();
+
+// live projection updates (SSE) — patch only the rows whose player changed
+(function () {
+  if (!window.EventSource) return;
+  const rows = document.querySelectorAll('tr[data-espn-id]');
+  if (!rows.length) return;
+
+  const rowsById = new Map();
+  rows.forEach(tr => {
+    const id = tr.dataset.espnId;
+    if (!rowsById.has(id)) rowsById.set(id, []);
+    rowsById.get(id).push(tr);
+  });
+
+  const DATA_KEY = { espn_ppr: 'ppr', espn_half: 'half', espn_std: 'std' };
+  const round2 = v => String(Math.round((Number(v) || 0) * 100) / 100);
+
+  function patchRow(tr, d) {
+    // Rows show the player's most recent game; ignore deltas for older games
+    const current = tr.dataset.gameId;
+    if (current && current !== d.game_id && (d.commence_time || '') < (tr.dataset.commence || '')) return false;
+    tr.dataset.gameId = d.game_id || current;
+    if (d.commence_time) tr.dataset.commence = d.commence_time;
+
+    if (d.fantasy) {
+      const td = tr.querySelector('td.fantasy-col');
+      if (td) {
+        Object.entries(DATA_KEY).forEach(([k, attr]) => {
+          if (k in d.fantasy) td.dataset[attr] = (Number(d.fantasy[k]) || 0).toFixed(2);
+        });
+        let scoring = 'espn_ppr';
+        try { scoring = localStorage.getItem('scoring') || scoring; } catch (e) { }
+        td.textContent = td.dataset[DATA_KEY[scoring] || 'ppr'] || '0.00';
+      }
+    }
+    if (d.projections) {
+      Object.entries(d.projections).forEach(([prop, v]) => {
+        const td = tr.querySelector(`td[data-prop="${prop}"]`);
+        if (td) td.textContent = round2(v);
+      });
+    }
+
+    tr.classList.remove('row-updated');
+    void tr.offsetWidth;  // restart the highlight animation
+    tr.classList.add('row-updated');
+    return true;
+  }
+
+  const source = new EventSource('/api/nfl/stream');
+  source.addEventListener('projection', (e) => {
+    let d;
+    try { d = JSON.parse(e.data); } catch (err) { return; }
+    const targets = rowsById.get(String(d.espn_id));
+    if (!targets) return;
+
+    const tables = new Set();
+    targets.forEach(tr => { if (patchRow(tr, d)) tables.add(tr.closest('table')); });
+    if (window.jQuery) tables.forEach(t => jQuery(t).trigger('update'));
+  });
+  // the server couldn't replay what we missed while disconnected
+  source.addEventListener('resync', () => {
+    source.close();
+    window.location.reload();
+  });
+})();
@@ -0,0 +1,229 @@
+"""
+Board/team table rows shared by app.py and the ingest scripts.
+
+Saved teams get a precomputed table in fantasy_football.team_tables, rebuilt
+when the roster is saved (/api/team*) and when ingest touches one of the
+roster's players, so /teams only has to read them.
+"""
+from datetime import datetime, timezone
+
+from db import get_db
+from lineup import lineups_for_table
+
+DB_NAME          = "fantasy_football"
+TEAM_TABLES_COLL = "team_tables"
+
+POSITIONS_BY_PROP = {
+    "player_pass_yds":      ["QB"],
+    "player_pass_tds":      ["QB"],
+    "player_rush_yds":      ["QB", "RB"],
+    "player_rush_tds":      ["QB", "RB"],
+    "player_receptions":    ["RB", "WR", "TE"],
+    "player_reception_yds": ["RB", "WR", "TE"],
+    "player_reception_tds": ["RB", "WR", "TE"],
+}
+POSITIONS_ORDER = ["QB", "RB", "WR", "TE"]
+
+SCORING_LABELS = {
+    "espn_ppr":  "Fantasy (PPR)",
+    "espn_half": "Fantasy (Half)",
+    "espn_std":  "Fantasy (Standard)",
+}
+
+def _parse_iso(s: str):
+    try:
+        # handles ...Z by converting to +00:00
+        return datetime.fromisoformat(s.replace("Z", "+00:00"))
+    except Exception:
+        return None
+
+def build_logo_map(tcol):
+    out = {}
+    for t in tcol.find({}, {"_id": 0, "abbrev": 1, "logo": 1}):
+        ab = (t.get("abbrev") or "").upper()
+        if ab and ab not in out:
+            out[ab] = t.get("logo")
+    return out
+
+def get_recent_game(player_doc):
+    if player_doc.get("latest_game"):
+        return player_doc["latest_game"]
+    # Embedded layout, before migrate_player_games has run
+    games = player_doc.get("games") or []
+    games = [g for g in games if g.get("commence_time")]
+    games.sort(key=lambda g: _parse_iso(g["commence_time"]) or datetime.min)
+    return games[-1] if games else None
+
+def team_and_opponent_cells(team_abbrev, recent, logo_by_abbrev):
+    team_abbrev = (team_abbrev or "—").upper()
+    team_logo = logo_by_abbrev.get(team_abbrev)
+    opp_abbrev = opp_logo = None
+    if recent:
+        home = (recent.get("home_team") or "").upper()
+        away = (recent.get("away_team") or "").upper()
+        if team_abbrev == home:
+            opp_abbrev = away
+        elif team_abbrev == away:
+            opp_abbrev = home
+        if opp_abbrev:
+            opp_logo = logo_by_abbrev.get(opp_abbrev)
+    return {"abbrev": team_abbrev, "logo": team_logo}, {"abbrev": opp_abbrev, "logo": opp_logo}
+
+def fantasy_cell(recent):
+    f = (recent or {}).get("fantasy") or {}
+    return {
+        "type": "fantasy",
+        "values": {
+            "espn_ppr":  round(float(f.get("espn_ppr", 0)  or 0), 2),
+            "espn_half": round(float(f.get("espn_half", 0) or 0), 2),
+            "espn_std":  round(float(f.get("espn_std", 0)  or 0), 2),
+        }
+    }
+
+def projection_values(recent, props):
+    proj = (recent or {}).get("projections") or {}
+    return [round(float(proj.get(prop, 0) or 0), 2) for prop in props]
+
+def build_row(player_doc, logo_by_abbrev, props):
+    recent = get_recent_game(player_doc)
+    team_cell, opp_cell = team_and_opponent_cells(player_doc.get("team"), recent, logo_by_abbrev)
+    return {
+        "name":    player_doc.get("name"),
+        "espn_id": player_doc.get("espn_id"),
+        "game_id": (recent or {}).get("game_id"),
+        "commence_time": (recent or {}).get("commence_time"),
+        "stats":   [team_cell, opp_cell, fantasy_cell(recent)] + projection_values(recent, props),
+    }
+
+
+def prop_title(prop):
+    return prop.replace("player_", "").replace("_", " ").title()
+
+def roster_espn_ids(players):
+    ids = set()
+    for p in players or []:
+        eid = p.get("espnId") or p.get("espn_id")
+        try:
+            ids.add(int(eid))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+def build_team_table(players, docs_by_id, logo_by_abbrev):
+    """
+    Columns/rows for one saved roster. docs_by_id maps str(espn_id) to the
+    player docs already fetched for it. The fantasy column is stored as plain
+    "Fantasy" and labelled per scoring choice at read time.
+    """
+    resolved = {}
+    for p in players or []:
+        eid = str(p.get("espnId") or p.get("espn_id") or "")
+        if not eid or eid in resolved:
+            continue
+        # Players missing in DB → placeholder with no games
+        resolved[eid] = docs_by_id.get(eid) or {
+            "name": p.get("name"),
+            "espn_id": eid,
+            "team": p.get("team"),
+            "position": None,
+            "latest_game": None,
+        }
+    resolved_players = list(resolved.values())
+
+    # Union of props across positions on this roster
+    roles_present = {rp.get("position") for rp in resolved_players if rp.get("position")}
+    props_union = [prop for prop, roles in POSITIONS_BY_PROP.items() if any(role in roles for role in roles_present)]
+
+    # Same columns/rows as /nfl, with Position column
+    columns = ["Team", "Opponent", "Pos", "Fantasy"] + [prop_title(prop) for prop in props_union]
+    rows = [
+        {**row, "stats": [row["stats"][0], row["stats"][1], str(pdoc.get("position") or "").upper(), *row["stats"][2:]]}
+        for pdoc in resolved_players
+        for row in [build_row(pdoc, logo_by_abbrev, props_union)]
+    ]
+    return {"columns": columns, "rows": rows, "props": props_union}
+
+def team_tables_collection():
+    return get_db(DB_NAME)[TEAM_TABLES_COLL]
+
+def _fetch_docs(espn_ids):
+    pcol = get_db(DB_NAME)["players"]
+    docs = pcol.find(
+        {"espn_id": {"$in": list(espn_ids)}},
+        {"name": 1, "espn_id": 1, "team": 1, "position": 1, "latest_game": 1}
+    )
+    return {str(d["espn_id"]): d for d in docs}
+
+def _table_doc(email, team, docs_by_id, logo_by_abbrev):
+    players = team.get("players") or []
+    table   = build_team_table(players, docs_by_id, logo_by_abbrev)
+    return {
+        "email":      email,
+        "leagueId":   team.get("leagueId"),
+        "teamId":     team.get("teamId"),
+        "players":    players,
+        "espn_ids":   sorted(roster_espn_ids(players)),
+        "rosterHash": team.get("rosterHash"),
+        "table":      table,
+        "lineupSlots": team.get("lineupSlots"),
+        "lineup":     lineups_for_table(table, team.get("lineupSlots")),
+        "built_at":   datetime.now(timezone.utc),
+    }
+
+def refresh_team_table(email, team, logo_by_abbrev=None):
+    """Rebuild and store the table for one saved team; returns the stored doc."""
+    if logo_by_abbrev is None:
+        logo_by_abbrev = build_logo_map(get_db(DB_NAME)["teams"])
+    docs_by_id = _fetch_docs(roster_espn_ids(team.get("players")))
+    doc = _table_doc(email, team, docs_by_id, logo_by_abbrev)
+    team_tables_collection().replace_one(
+        {"email": email, "leagueId": doc["leagueId"], "teamId": doc["teamId"]},
+        doc,
+        upsert=True
+    )
+    return doc
+
+def refresh_tables_for_players(espn_ids=None):
+    """
+    Rebuild every stored team table that contains one of espn_ids (all tables
+    when None). Used by ingest after projections/fantasy change.
+    """
+    coll = team_tables_collection()
+    query = {} if espn_ids is None else {"espn_ids": {"$in": [int(e) for e in espn_ids]}}
+    stale = list(coll.find(query, {"table": 0}))
+    if not stale:
+        return 0
+
+    logo_by_abbrev = build_logo_map(get_db(DB_NAME)["teams"])
+    all_ids = set()
+    for t in stale:
+        all_ids.update(t.get("espn_ids") or [])
+    docs_by_id = _fetch_docs(all_ids)
+
+    for t in stale:
+        doc = _table_doc(t["email"], t, docs_by_id, logo_by_abbrev)
+        coll.replace_one({"_id": t["_id"]}, doc)
+    return len(stale)
+
+def load_team_tables(email, teams):
+    """
+    Stored table docs ({table, lineup, ...}) for a user's teams keyed by
+    (leagueId, teamId). Teams saved before tables existed (or whose roster
+    changed underneath) are built now.
+    """
+    stored = {
+        (d.get("leagueId"), d.get("teamId")): d
+        for d in team_tables_collection().find({"email": email})
+    }
+    logo_by_abbrev = None
+    for t in teams:
+        key = (t.get("leagueId"), t.get("teamId"))
+        cur = stored.get(key)
+        if cur is None or cur.get("rosterHash") != t.get("rosterHash"):
+            if logo_by_abbrev is None:
+                logo_by_abbrev = build_logo_map(get_db(DB_NAME)["teams"])
+            stored[key] = refresh_team_table(email, t, logo_by_abbrev)
+        elif "lineup" not in cur:
+            # stored before lineups existed; ingest or the next save persists one
+            cur["lineup"] = lineups_for_table(cur.get("table"), t.get("lineupSlots"))
+    return stored
@@ -0,0 +1,235 @@
+"""
+Per-player projection deltas, from the ingest scripts to open pages.
+
+Ingest (load_data, compute_projections) appends small delta documents to a
+capped collection. Each app worker runs one background thread that tails
+that collection and fans every delta out to its connected SSE clients, so
+a change costs one read per worker rather than one page load per viewer.
+Every frame carries the delta's _id as its SSE id, so a reconnecting
+EventSource (Last-Event-ID) is replayed what it missed from the capped
+collection; if that has already rolled off, it is told to reload instead.
+
+Ingest also bumps a single data-version document; caches of rendered pages
+(fragments.py) key on it, so any write makes them miss on the next read.
+While the invalidation bus (invalidation.py) is live it expires the cached
+version on every bump, so workers can re-read it far less often.
+
+SSE holds a connection open per viewer: run gunicorn with a threaded or
+async worker class (e.g. `-k gthread --threads 32`) when serving /api/nfl/stream.
+"""
+import json
+import queue
+from bson import ObjectId
+from bson.errors import InvalidId
+import threading
+import time
+from datetime import datetime, timezone
+from pymongo import CursorType, ReturnDocument
+from pymongo.errors import CollectionInvalid
+
+from db import get_db
+
+# ——— CONFIG ———
+DB_NAME          = "fantasy_football"
+UPDATES_COLL     = "projection_updates"
+UPDATES_BYTES    = 8 * 1024 * 1024    # capped: oldest deltas roll off
+SUBSCRIBER_QUEUE = 1000               # per-connection backlog before we drop it
+HEARTBEAT_SECS   = 15
+CLOSED           = None               # queued for a dropped subscriber: end its stream
+META_COLL        = "meta"
+DATA_VERSION_ID  = "data_version"
+VERSION_TTL_SECS = 2                  # how stale a worker's view of the version may be
+
+
+def updates_collection():
+    db = get_db(DB_NAME)
+    try:
+        db.create_collection(UPDATES_COLL, capped=True, size=UPDATES_BYTES)
+    except CollectionInvalid:
+        pass  # already exists
+    return db[UPDATES_COLL]
+
+
+def publish_updates(deltas: list):
+    """
+    deltas: [{"espn_id", "game_id", "commence_time", "projections"?, "fantasy"?}, ...]
+    """
+    if not deltas:
+        return
+    now = datetime.now(timezone.utc)
+    updates_collection().insert_many([{**d, "ts": now} for d in deltas], ordered=False)
+
+
+def bump_data_version(reason=None) -> int:
+    """Called by ingest after it changes player documents."""
+    doc = get_db(DB_NAME)[META_COLL].find_one_and_update(
+        {"_id": DATA_VERSION_ID},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now(timezone.utc), "reason": reason}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc["version"]
+
+
+_version_lock = threading.Lock()
+_version = (0.0, None)   # (monotonic time read, version)
+_version_ttl = VERSION_TTL_SECS
+
+def set_version_ttl(secs=None):
+    """Lengthen the version TTL while something else expires it on writes; None restores the default."""
+    global _version_ttl
+    _version_ttl = secs or VERSION_TTL_SECS
+
+def expire_data_version():
+    global _version
+    _version = (0.0, None)
+
+def data_version() -> int:
+    """Current data version, re-read from Mongo at most every VERSION_TTL_SECS (or the bus's TTL)."""
+    global _version
+    read_at, version = _version
+    if version is not None and time.monotonic() - read_at < _version_ttl:
+        return version
+    with _version_lock:
+        read_at, version = _version
+        if version is None or time.monotonic() - read_at >= _version_ttl:
+            doc = get_db(DB_NAME)[META_COLL].find_one({"_id": DATA_VERSION_ID}) or {}
+            version = doc.get("version", 0)
+            _version = (time.monotonic(), version)
+    return version
+
+
+class Broadcaster:
+    """One tailing thread per process, fanning deltas out to subscriber queues."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+
+    def subscribe(self) -> queue.Queue:
+        q = queue.Queue(maxsize=SUBSCRIBER_QUEUE)
+        with self._lock:
+            self._subscribers.add(q)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._tail, name="projection-updates", daemon=True)
+                self._thread.start()
+        return q
+
+    def unsubscribe(self, q: queue.Queue):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def _publish(self, doc: dict):
+        item = (doc["_id"], frame_data(doc))
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(item)
+            except queue.Full:
+                # A stalled client shouldn't hold the others back
+                self.drop(q)
+
+    def drop(self, q: queue.Queue):
+        """
+        Unsubscribe a lagging client and end its stream. Its backlog is
+        discarded; EventSource reconnects (after `retry`) with Last-Event-ID
+        and sse_stream replays the missed deltas from the capped collection.
+        """
+        self.unsubscribe(q)
+        try:
+            while True:
+                q.get_nowait()
+        except queue.Empty:
+            pass
+        q.put_nowait(CLOSED)
+
+    def _tail(self):
+        coll = updates_collection()
+        last = coll.find_one({}, sort=[("$natural", -1)], projection={"_id": 1})
+        last_id = last["_id"] if last else None
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            query = {"_id": {"$gt": last_id}} if last_id else {}
+            try:
+                cursor = coll.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    for doc in cursor:
+                        last_id = doc["_id"]
+                        self._publish(doc)
+                    with self._lock:
+                        if not self._subscribers:
+                            break
+            except Exception as e:
+                print(f"projection-updates tail error: {e}")
+            # Tailable cursors die on an empty capped collection; back off briefly
+            time.sleep(1)
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def broadcaster() -> Broadcaster:
+    global _broadcaster
+    with _broadcaster_lock:
+        if _broadcaster is None:
+            _broadcaster = Broadcaster()
+        return _broadcaster
+
+
+def frame_data(doc: dict) -> str:
+    return json.dumps({k: v for k, v in doc.items() if k not in ("_id", "ts")}, default=str)
+
+def projection_frame(delta_id, data: str) -> str:
+    return f"id: {delta_id}\nevent: projection\ndata: {data}\n\n"
+
+def missed_since(last_event_id):
+    """
+    Deltas after last_event_id, oldest first, or None when they can't all be
+    replayed (unknown id, or it has rolled off the capped collection).
+    """
+    try:
+        last_id = ObjectId(last_event_id)
+    except (InvalidId, TypeError):
+        return None
+    coll = updates_collection()
+    if coll.find_one({"_id": last_id}, {"_id": 1}) is None:
+        return None
+    return list(coll.find({"_id": {"$gt": last_id}}).sort("_id", 1))
+
+
+def sse_stream(last_event_id=None):
+    """Generator of SSE frames for one client connection."""
+    b = broadcaster()
+    q = b.subscribe()   # before the replay read, so nothing falls in between
+    try:
+        yield "retry: 5000\n\n"
+        last_id = None
+        if last_event_id:
+            missed = missed_since(last_event_id)
+            if missed is None:
+                yield "event: resync\ndata: {}\n\n"
+                return
+            last_id = ObjectId(last_event_id)
+            for doc in missed:
+                last_id = doc["_id"]
+                yield projection_frame(doc["_id"], frame_data(doc))
+        while True:
+            try:
+                item = q.get(timeout=HEARTBEAT_SECS)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            if item is CLOSED:
+                return
+            delta_id, data = item
+            if last_id is not None and delta_id <= last_id:
+                continue   # already sent by the replay
+            yield projection_frame(delta_id, data)
+    finally:
+        b.unsubscribe(q)